@@ -0,0 +1,146 @@
+"""Startup-time regression benchmark for the rebake CLI.
+
+Runs `rebake --help` and `rebake check` under `python -X importtime` against a
+throwaway local template, reports the cumulative import cost per command and
+fails when a command imports a forbidden module or more modules than its
+budget allows. Import times are reported but not enforced, since they depend
+on the machine; the module count does not, but it does depend on the Python
+version and the installed dependencies, so its budgets are keyed by Python
+version and measured against the locked dependencies.
+
+    uv run python benchmarks/importtime.py            # report
+    uv run python benchmarks/importtime.py --check    # enforce budgets (CI)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+BUDGETS_FILE = Path(__file__).parent / "importtime_budgets.json"
+
+# Invoke the typer app directly so the measurement does not depend on an installed entry point
+_LAUNCHER = "import sys; from rebake.cli import app; sys.argv[0] = 'rebake'; app()"
+
+
+@dataclass
+class ImportTimeResult:
+    command: str
+    import_ms: float
+    wall_ms: float
+    modules: int
+    forbidden: list[str]
+
+
+def _git(args: list[str], cwd: Path) -> str:
+    result = subprocess.run(["git", *args], capture_output=True, text=True, check=True, cwd=cwd)
+    return result.stdout.strip()
+
+
+def _make_project(root: Path) -> Path:
+    """Create a one-file template repository and a project pinned to its HEAD."""
+    template = root / "template"
+    (template / "{{cookiecutter.project_name}}").mkdir(parents=True)
+    (template / "cookiecutter.json").write_text(json.dumps({"project_name": "bench"}))
+    (template / "{{cookiecutter.project_name}}" / "README.md").write_text("# {{cookiecutter.project_name}}\n")
+    _git(["init", "-q"], template)
+    _git(["-c", "user.email=bench@bench", "-c", "user.name=bench", "add", "."], template)
+    _git(["-c", "user.email=bench@bench", "-c", "user.name=bench", "commit", "-q", "-m", "init"], template)
+
+    project = root / "project"
+    project.mkdir()
+    (project / ".cruft.json").write_text(
+        json.dumps(
+            {
+                "template": str(template),
+                "commit": _git(["rev-parse", "HEAD"], template),
+                "context": {"cookiecutter": {"project_name": "bench"}},
+            }
+        )
+    )
+    return project
+
+
+def _parse_importtime(stderr: str) -> tuple[float, list[str]]:
+    """Return (total cumulative import time in ms, imported top-level package names)."""
+    total_us = 0
+    packages: list[str] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        packages.append(name.strip().split(".")[0])
+        # Top-level imports are not indented; their cumulative time covers their children
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000, packages
+
+
+def measure(name: str, args: list[str], forbidden: list[str], repeat: int) -> ImportTimeResult:
+    import_samples: list[float] = []
+    wall_samples: list[float] = []
+    packages: list[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _LAUNCHER, *args],
+            capture_output=True,
+            text=True,
+        )
+        wall_samples.append((time.perf_counter() - start) * 1000)
+        import_ms, packages = _parse_importtime(result.stderr)
+        import_samples.append(import_ms)
+    return ImportTimeResult(
+        command=name,
+        import_ms=round(statistics.median(import_samples), 2),
+        wall_ms=round(statistics.median(wall_samples), 2),
+        modules=len(packages),
+        forbidden=sorted({p for p in packages if p in forbidden}),
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per command; the median is reported")
+    parser.add_argument("--check", action="store_true", help="exit non-zero when a budget is exceeded")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    opts = parser.parse_args(argv)
+
+    budgets = json.loads(BUDGETS_FILE.read_text())
+    version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    failures: list[str] = []
+    results: list[ImportTimeResult] = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = _make_project(Path(tmpdir))
+        commands = {"--help": ["--help"], "check": ["check", str(project)]}
+        for name, args in commands.items():
+            budget = budgets[name]
+            result = measure(name, args, budget["forbidden"], opts.repeat)
+            results.append(result)
+            print(f"{name:8} import={result.import_ms:8.2f}ms wall={result.wall_ms:8.2f}ms modules={result.modules}")
+            if result.forbidden:
+                failures.append(f"{name}: imports forbidden modules {', '.join(result.forbidden)}")
+            max_modules = budget["max_modules"].get(version)
+            if max_modules is None:
+                print(f"{name:8} no module budget for Python {version}", file=sys.stderr)
+            elif result.modules > max_modules:
+                failures.append(f"{name}: {result.modules} imported modules exceed budget {max_modules}")
+
+    if opts.output:
+        opts.output.write_text(json.dumps([asdict(r) for r in results], indent=2) + "\n")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if opts.check and failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""End-to-end benchmark of the rebake clone/render/diff/apply pipeline.
+
+Generates a synthetic template (see synthetic.py), serves it over file:// or a
+local `git daemon`, optionally injects network latency into remote git calls,
+and times `rebake check`, `rebake update` and a batch of checks, both as one
+process per project and as a single multi-project `rebake check`. Per-phase numbers come from each run's --trace output.
+Every run uses a throwaway cache and no daemon, and each update starts cold.
+
+    uv run python -m benchmarks.pipeline --files 500 --history-depth 50 --output results.json
+    uv run python -m benchmarks.pipeline --baseline results.json   # fail on regressions
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.synthetic import TemplateSpec, make_project, make_template
+
+SCHEMA_VERSION = 1
+_LAUNCHER = "import sys; from rebake.cli import app; sys.argv[0] = 'rebake'; app()"
+
+# Remote-facing git subcommands that pay the injected round-trip latency
+_SHIM = """#!/bin/sh
+case "$1" in
+  ls-remote|clone|fetch) sleep {latency} ;;
+esac
+exec {git} "$@"
+"""
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    runs: int
+    wall_ms: dict[str, float]
+    phases_ms: dict[str, float]
+    exit_codes: list[int] = field(default_factory=list)
+
+
+@contextmanager
+def serve(root: Path, template: Path, transport: str) -> Iterator[str]:
+    """Yield the URL projects should use to reach the template."""
+    if transport == "file":
+        yield template.as_uri()
+        return
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    daemon = subprocess.Popen(
+        [
+            "git",
+            "daemon",
+            "--reuseaddr",
+            "--export-all",
+            "--listen=127.0.0.1",
+            f"--port={port}",
+            f"--base-path={root}",
+            str(root),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(50):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("git daemon did not start")
+        yield f"git://127.0.0.1:{port}/{template.relative_to(root)}"
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+
+def bench_env(root: Path, latency_ms: float) -> dict[str, str]:
+    """Return an environment isolated from the user's cache and daemon, whose `git` sleeps before every remote call."""
+    env = dict(os.environ)
+    env["REBAKE_CACHE_DIR"] = str(root / "cache")
+    env["REBAKE_NO_DAEMON"] = "1"
+    env.pop("REBAKE_SCRATCH_DIR", None)
+    if latency_ms <= 0:
+        return env
+    shim_dir = root / "shim"
+    shim_dir.mkdir()
+    shim = shim_dir / "git"
+    shim.write_text(_SHIM.format(latency=latency_ms / 1000, git=shutil.which("git")))
+    shim.chmod(0o755)
+    env["PATH"] = f"{shim_dir}{os.pathsep}{env['PATH']}"
+    return env
+
+
+def _phase_totals(trace_file: Path) -> dict[str, float]:
+    totals: dict[str, float] = defaultdict(float)
+    for event in json.loads(trace_file.read_text())["traceEvents"]:
+        if event["cat"] in ("phase", "git"):
+            totals[event["name"]] += event["dur"] / 1000
+    return totals
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    return {
+        "median": round(statistics.median(samples), 2),
+        "min": round(min(samples), 2),
+        "max": round(max(samples), 2),
+    }
+
+
+def run_rebake(
+    args: list[str], env: dict[str, str], trace_file: Path, expected_code: int
+) -> tuple[float, int, dict[str, float]]:
+    """Run rebake once; raise RuntimeError when it exits with anything but expected_code."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _LAUNCHER, *args, "--trace", str(trace_file)],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall = (time.perf_counter() - start) * 1000
+    if result.returncode != expected_code:
+        # A failed run is usually a fast one, so it must not end up in the timings
+        raise RuntimeError(
+            f"`rebake {' '.join(args)}` exited with {result.returncode}, expected {expected_code}\n{result.stderr}"
+        )
+    phases = _phase_totals(trace_file) if trace_file.exists() else {}
+    return wall, result.returncode, phases
+
+
+def run_scenario(
+    name: str,
+    setup: Callable[[int], list[list[str]]],
+    env: dict[str, str],
+    work: Path,
+    repeat: int,
+    expected_code: int,
+) -> ScenarioResult:
+    """Time `repeat` runs of a scenario.
+
+    setup(i) prepares run i (untimed) and returns the rebake commands it executes in sequence.
+    Every command must exit with expected_code.
+    """
+    walls: list[float] = []
+    codes: list[int] = []
+    phases: dict[str, list[float]] = defaultdict(list)
+    for i in range(repeat):
+        commands = setup(i)
+        run_wall = 0.0
+        run_phases: dict[str, float] = defaultdict(float)
+        for j, args in enumerate(commands):
+            wall, code, cmd_phases = run_rebake(args, env, work / f"{name}-{i}-{j}.trace.json", expected_code)
+            run_wall += wall
+            codes.append(code)
+            for phase, ms in cmd_phases.items():
+                run_phases[phase] += ms
+        walls.append(run_wall)
+        for phase, ms in run_phases.items():
+            phases[phase].append(ms)
+    return ScenarioResult(
+        scenario=name,
+        runs=repeat,
+        wall_ms=_summary(walls),
+        phases_ms={phase: round(statistics.median(ms), 2) for phase, ms in sorted(phases.items())},
+        exit_codes=sorted(set(codes)),
+    )
+
+
+def benchmark(spec: TemplateSpec, transport: str, latency_ms: float, batch: int, repeat: int) -> list[ScenarioResult]:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        template, commits = make_template(root, spec)
+        env = bench_env(root, latency_ms)
+        with serve(root, template, transport) as url:
+            pristine = make_project(root, template, url, commits[0])
+            batch_projects = [make_project(root, template, url, commits[0], f"batch-{i}") for i in range(batch)]
+
+            def fresh_project(i: int) -> list[list[str]]:
+                # update mutates the project, so each run starts from a copy of the pristine one,
+                # and from an empty cache so that every run pays for its checkouts and renders
+                project = root / f"update-{i}"
+                shutil.copytree(pristine, project, symlinks=True)
+                shutil.rmtree(env["REBAKE_CACHE_DIR"], ignore_errors=True)
+                return [["update", str(project)]]
+
+            # Projects start at the first template commit, so check reports them outdated (exit 1)
+            return [
+                run_scenario("check", lambda i: [["check", str(pristine)]], env, root, repeat, 1),
+                run_scenario(
+                    "batch-check", lambda i: [["check", str(p)] for p in batch_projects], env, root, repeat, 1
+                ),
+                run_scenario(
+                    "batch-check-multi", lambda i: [["check", *map(str, batch_projects)]], env, root, repeat, 1
+                ),
+                run_scenario("update", fresh_project, env, root, repeat, 0),
+            ]
+
+
+def compare(results: list[ScenarioResult], baseline_file: Path, threshold: float) -> list[str]:
+    """Return regressions where a scenario's median wall time grew by more than threshold."""
+    baseline = {r["scenario"]: r for r in json.loads(baseline_file.read_text())["results"]}
+    regressions = []
+    for result in results:
+        if result.scenario not in baseline:
+            continue
+        before = baseline[result.scenario]["wall_ms"]["median"]
+        after = result.wall_ms["median"]
+        if before and (after - before) / before > threshold:
+            regressions.append(f"{result.scenario}: {before}ms -> {after}ms (+{(after - before) / before:.0%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=TemplateSpec.files)
+    parser.add_argument("--file-size", type=int, default=TemplateSpec.file_size, help="bytes per text file")
+    parser.add_argument("--binary-assets", type=int, default=TemplateSpec.binary_assets)
+    parser.add_argument("--binary-size", type=int, default=TemplateSpec.binary_size, help="bytes per binary asset")
+    parser.add_argument("--hook-seconds", type=float, default=TemplateSpec.hook_seconds)
+    parser.add_argument("--history-depth", type=int, default=TemplateSpec.history_depth)
+    parser.add_argument("--changes-per-commit", type=int, default=TemplateSpec.changes_per_commit)
+    parser.add_argument("--transport", choices=["file", "daemon"], default="file")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to each remote git call")
+    parser.add_argument("--batch", type=int, default=5, help="number of projects in the batch scenario")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against a previous --output file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    opts = parser.parse_args(argv)
+
+    spec = TemplateSpec(
+        files=opts.files,
+        file_size=opts.file_size,
+        binary_assets=opts.binary_assets,
+        binary_size=opts.binary_size,
+        hook_seconds=opts.hook_seconds,
+        history_depth=opts.history_depth,
+        changes_per_commit=opts.changes_per_commit,
+    )
+    results = benchmark(spec, opts.transport, opts.latency_ms, opts.batch, opts.repeat)
+
+    for result in results:
+        print(f"{result.scenario:18} median={result.wall_ms['median']:9.2f}ms exit={result.exit_codes}")
+        for phase, ms in result.phases_ms.items():
+            print(f"    {phase:18} {ms:9.2f}ms")
+
+    if opts.output:
+        report = {
+            "schema": SCHEMA_VERSION,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "git": subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip(),
+            },
+            "params": {**asdict(spec), "transport": opts.transport, "latency_ms": opts.latency_ms, "batch": opts.batch},
+            "results": [asdict(r) for r in results],
+        }
+        opts.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if opts.baseline:
+        regressions = compare(results, opts.baseline, opts.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
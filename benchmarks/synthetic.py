@@ -0,0 +1,124 @@
+"""Synthetic cookiecutter templates and projects for the pipeline benchmark."""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+_GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+_HOOK = """import time
+
+time.sleep({seconds})
+"""
+
+
+@dataclass
+class TemplateSpec:
+    files: int = 50
+    file_size: int = 2048
+    binary_assets: int = 0
+    binary_size: int = 65536
+    hook_seconds: float = 0.0
+    history_depth: int = 10
+    changes_per_commit: int = 3
+    seed: int = 0
+
+
+def git(args: list[str], cwd: Path) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=cwd,
+        env={**os.environ, **_GIT_ENV},
+    )
+    return result.stdout.strip()
+
+
+def _text(rng: random.Random, size: int) -> str:
+    # Line-oriented content so that template changes produce ordinary text hunks
+    lines = []
+    total = 0
+    while total < size:
+        line = f"{{{{cookiecutter.project_name}}}} line {rng.randrange(1_000_000):06d}\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+def make_template(root: Path, spec: TemplateSpec) -> tuple[Path, list[str]]:
+    """Create a template repository and return it with its commits, oldest first."""
+    rng = random.Random(spec.seed)
+    repo = root / "template"
+    project = repo / "{{cookiecutter.project_name}}"
+    project.mkdir(parents=True)
+    (repo / "cookiecutter.json").write_text(json.dumps({"project_name": "bench-project"}))
+
+    text_files = [project / f"pkg{i % 10}" / f"module_{i}.txt" for i in range(spec.files)]
+    for path in text_files:
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(_text(rng, spec.file_size))
+    for i in range(spec.binary_assets):
+        assets = project / "assets"
+        assets.mkdir(exist_ok=True)
+        (assets / f"asset_{i}.bin").write_bytes(rng.randbytes(spec.binary_size))
+    if spec.hook_seconds:
+        (repo / "hooks").mkdir()
+        (repo / "hooks" / "post_gen_project.py").write_text(_HOOK.format(seconds=spec.hook_seconds))
+
+    git(["init", "-q", "-b", "main"], repo)
+    git(["add", "."], repo)
+    git(["commit", "-q", "-m", "initial"], repo)
+    commits = [git(["rev-parse", "HEAD"], repo)]
+
+    for depth in range(spec.history_depth):
+        for path in rng.sample(text_files, min(spec.changes_per_commit, len(text_files))):
+            with path.open("a") as f:
+                f.write(f"change {depth}\n")
+        git(["commit", "-q", "-am", f"change {depth}"], repo)
+        commits.append(git(["rev-parse", "HEAD"], repo))
+    return repo, commits
+
+
+def make_project(root: Path, template: Path, template_url: str, commit: str, name: str = "project") -> Path:
+    """Render the template at commit into a committed project pinned to that commit."""
+    from rebake.utils.git import clone_at_commit
+    from rebake.utils.template import render_template
+
+    checkout = root / f"{name}-checkout"
+    clone_at_commit(str(template), commit, checkout)
+    output = root / f"{name}-output"
+    output.mkdir()
+    rendered = render_template(checkout, {"project_name": "bench-project"}, output)
+    project = root / name
+    shutil.move(rendered, project)
+    shutil.rmtree(checkout)
+    shutil.rmtree(output)
+
+    (project / ".cruft.json").write_text(
+        json.dumps(
+            {
+                "template": template_url,
+                "commit": commit,
+                "context": {"cookiecutter": {"project_name": "bench-project"}},
+            },
+            indent=2,
+        )
+        + "\n"
+    )
+    git(["init", "-q"], project)
+    git(["add", "."], project)
+    git(["commit", "-q", "-m", "init project"], project)
+    return project
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
+from rebake import daemon
 from rebake.config import CruftConfig
-from rebake.utils.git import get_template_head_commit
+from rebake.utils.git import get_template_head_commit, get_template_head_commit_async
+from rebake.utils.timing import span
 
 
 class CheckResult(Enum):
@@ -12,10 +18,65 @@ class CheckResult(Enum):
     OUTDATED = "outdated"
 
 
+@dataclass
+class ProjectCheck:
+    """Outcome of checking one project; error is set instead of result when the check failed."""
+
+    project_dir: Path
+    result: CheckResult | None = None
+    commit: str | None = None
+    head_commit: str | None = None
+    error: Exception | None = None
+    duration: float = 0.0
+
+
 def is_up_to_date(project_dir: Path = Path(".")) -> CheckResult:
     """Check whether the project is up-to-date with its template."""
     config = CruftConfig.load(project_dir)
-    head_commit = get_template_head_commit(config.template, checkout=config.checkout)
+    with span("resolve", template=config.template):
+        head_commit = daemon.request("head", template=config.template, checkout=config.checkout)
+        if head_commit is None:
+            head_commit = get_template_head_commit(config.template, checkout=config.checkout)
     if config.commit == head_commit:
         return CheckResult.UP_TO_DATE
     return CheckResult.OUTDATED
+
+
+async def _resolve_head_async(config: CruftConfig) -> str:
+    with span("resolve", template=config.template):
+        head_commit = await asyncio.to_thread(
+            daemon.request, "head", template=config.template, checkout=config.checkout
+        )
+        if head_commit is None:
+            head_commit = await get_template_head_commit_async(config.template, checkout=config.checkout)
+    return head_commit
+
+
+async def check_projects_async(project_dirs: list[Path]) -> AsyncIterator[ProjectCheck]:
+    """Check several projects concurrently, yielding each outcome as soon as it is known.
+
+    Projects that share a template and checkout resolve its HEAD only once.
+    A project that cannot be checked yields an outcome carrying the exception.
+    """
+    heads: dict[tuple[str, str | None], asyncio.Task[str]] = {}
+
+    async def check_one(project_dir: Path) -> ProjectCheck:
+        outcome = ProjectCheck(project_dir)
+        start = time.perf_counter()
+        try:
+            config = CruftConfig.load(project_dir)
+            outcome.commit = config.commit
+            key = (config.template, config.checkout)
+            if key not in heads:
+                heads[key] = asyncio.create_task(_resolve_head_async(config))
+            outcome.head_commit = await heads[key]
+        except Exception as e:
+            outcome.error = e
+        else:
+            up_to_date = outcome.commit == outcome.head_commit
+            outcome.result = CheckResult.UP_TO_DATE if up_to_date else CheckResult.OUTDATED
+        outcome.duration = time.perf_counter() - start
+        return outcome
+
+    for next_result in asyncio.as_completed([check_one(p) for p in project_dirs]):
+        yield await next_result
@@ -1,45 +1,320 @@
 from __future__ import annotations
 
+import json
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from enum import Enum
+from functools import cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import typer
-from rich.console import Console
 
-from rebake.check import CheckResult, is_up_to_date
+from rebake.utils.steps import StepMode
+from rebake.utils.timing import Recorder, active_recorder, recording, span
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+# Keep module-level imports minimal: `rebake check` runs in pre-commit hooks, so
+# rich and the cookiecutter/Jinja stack are only imported by the code paths that need them.
 
 app = typer.Typer(help="A spiritual successor to cruft for managing cookiecutter projects.")
-console = Console()
-err_console = Console(stderr=True)
+
+
+@cache
+def _console() -> Console:
+    from rich.console import Console
+
+    return Console()
+
+
+@cache
+def _err_console() -> Console:
+    from rich.console import Console
+
+    return Console(stderr=True)
+
+
+def _print_timings(recorder: Recorder) -> None:
+    from rich.table import Table
+
+    table = Table(title="Timings")
+    table.add_column("Phase")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Files", justify="right")
+    table.add_column("Bytes", justify="right")
+    table.add_column("Copied", justify="right")
+    for s in recorder.spans:
+        size = s.args.get("bytes", s.args.get("bytes_out"))
+        table.add_row(
+            "  " * s.depth + s.name,
+            f"{s.duration * 1000:.1f}",
+            str(s.args.get("files", "")),
+            "" if size is None else str(size),
+            str(s.args.get("copied_bytes", "")),
+        )
+    _err_console().print(table)
+
+
+@contextmanager
+def _instrumented(command: str, project_dirs: list[Path], timings: bool, trace: Path | None) -> Iterator[None]:
+    """Record phase timings for the command when --timings or --trace is given."""
+    if not timings and trace is None:
+        yield
+        return
+    projects = [str(p) for p in project_dirs]
+    with recording() as recorder:
+        try:
+            with span(command, category="command", projects=projects):
+                yield
+        finally:
+            if timings:
+                _print_timings(recorder)
+            if trace is not None:
+                recorder.write_trace(trace, {"command": command, "projects": projects})
+
+
+TimingsOption = typer.Option(False, "--timings", help="Print a per-phase timing summary to stderr")
+TraceOption = typer.Option(None, "--trace", help="Write a Chrome trace (JSON) of all phases to this file")
+
+
+class OutputFormat(str, Enum):
+    TEXT = "text"
+    NDJSON = "ndjson"
+
+
+FormatOption = typer.Option(
+    OutputFormat.TEXT,
+    "--format",
+    help="ndjson writes one JSON record per project to stdout as soon as it finishes; other output goes to stderr",
+)
+
+
+def _emit(
+    command: str,
+    project_dir: Path,
+    status: str,
+    *,
+    old_commit: str | None = None,
+    new_commit: str | None = None,
+    changed_files: list[str] | None = None,
+    rejected_files: list[str] | None = None,
+    error: Exception | None = None,
+    timings: dict[str, Any],
+) -> None:
+    """Write one project's NDJSON record and flush it so consumers see it immediately.
+
+    Every record has the same keys; those a command does not compute are null.
+    """
+    record = {
+        "command": command,
+        "project": str(project_dir),
+        "status": status,
+        "old_commit": old_commit,
+        "new_commit": new_commit,
+        "changed_files": changed_files,
+        "rejected_files": rejected_files,
+        "error": None if error is None else str(error) or type(error).__name__,
+        "timings": timings,
+    }
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+@contextmanager
+def _project_timings() -> Iterator[dict[str, Any]]:
+    """Collect the total and per-phase durations (ms) of the work done inside the block.
+
+    Phases are the outermost spans recorded inside the block; repeated
+    phases (e.g. one render per step) are summed.
+    """
+    timings: dict[str, Any] = {}
+    recorder = active_recorder()
+    with nullcontext(recorder) if recorder is not None else recording() as rec:
+        first = len(rec.spans)
+        start = time.perf_counter()
+        try:
+            yield timings
+        finally:
+            spans = rec.spans[first:]
+            depth = min((s.depth for s in spans), default=0)
+            phases: dict[str, float] = {}
+            for s in spans:
+                if s.depth == depth:
+                    phases[s.name] = phases.get(s.name, 0.0) + s.duration * 1000
+            timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            timings["phases"] = {name: round(ms, 1) for name, ms in phases.items()}
+
+
+async def _check_many(project_dirs: list[Path], output_format: OutputFormat) -> int:
+    """Report each project's check result as soon as it is known and return the combined exit code."""
+    from rebake.check import CheckResult, check_projects_async
+
+    outdated = failed = False
+    async for outcome in check_projects_async(project_dirs):
+        project_dir = outcome.project_dir
+        failed = failed or outcome.error is not None
+        outdated = outdated or outcome.result == CheckResult.OUTDATED
+        if output_format == OutputFormat.NDJSON:
+            _emit(
+                "check",
+                project_dir,
+                "error" if outcome.result is None else outcome.result.value,
+                old_commit=outcome.commit,
+                new_commit=outcome.head_commit,
+                error=outcome.error,
+                timings={"total_ms": round(outcome.duration * 1000, 1)},
+            )
+        elif outcome.error is not None:
+            _err_console().print(f"[red]Error:[/red] {project_dir}: {outcome.error}")
+        elif outcome.result == CheckResult.UP_TO_DATE:
+            _console().print(f"[green]✓[/green] {project_dir}: up-to-date")
+        else:
+            _console().print(f"[yellow]![/yellow] {project_dir}: outdated")
+    return 2 if failed else 1 if outdated else 0
 
 
 @app.command()
 def check(
-    project_dir: Path = typer.Argument(Path("."), help="Path to the project directory"),
+    project_dirs: list[Path] | None = typer.Argument(
+        None, help="Paths to the project directories (default: current directory)", show_default=False
+    ),
+    output_format: OutputFormat = FormatOption,
+    timings: bool = TimingsOption,
+    trace: Path | None = TraceOption,
 ) -> None:
-    """Check if the project is up-to-date with its template."""
-    try:
-        result = is_up_to_date(project_dir)
-    except FileNotFoundError as e:
-        err_console.print(f"[red]Error:[/red] {e}")
-        raise typer.Exit(code=2)
+    """Check if the project is up-to-date with its template.
+
+    With several project directories, projects are checked concurrently and
+    each result is printed as soon as it is known.
+    """
+    from rebake.check import CheckResult, is_up_to_date
+    from rebake.utils.git import run_sync
+
+    project_dirs = project_dirs or [Path(".")]
+    with _instrumented("check", project_dirs, timings, trace):
+        if len(project_dirs) > 1 or output_format == OutputFormat.NDJSON:
+            raise typer.Exit(code=run_sync(_check_many(project_dirs, output_format)))
+        try:
+            result = is_up_to_date(project_dirs[0])
+        except FileNotFoundError as e:
+            _err_console().print(f"[red]Error:[/red] {e}")
+            raise typer.Exit(code=2)
 
     if result == CheckResult.UP_TO_DATE:
-        console.print("[green]✓[/green] Project is up-to-date.")
+        _console().print("[green]✓[/green] Project is up-to-date.")
         raise typer.Exit(code=0)
     else:
-        console.print("[yellow]![/yellow] Project is outdated.")
+        _console().print("[yellow]![/yellow] Project is outdated.")
         raise typer.Exit(code=1)
 
 
 @app.command()
 def update(
-    project_dir: Path = typer.Argument(Path("."), help="Path to the project directory"),
+    project_dirs: list[Path] | None = typer.Argument(
+        None, help="Paths to the project directories (default: current directory)", show_default=False
+    ),
+    steps: StepMode | None = typer.Option(
+        None,
+        "--steps",
+        help="Apply the template history one first-parent commit (or tagged release) at a time, "
+        "stopping at the first conflict",
+    ),
+    resume: bool = typer.Option(False, "--resume", help="Continue an interrupted update from its last completed phase"),
+    scratch_dir: Path | None = typer.Option(
+        None,
+        "--scratch-dir",
+        help="Directory for the update's work files, e.g. on a tmpfs (default: $REBAKE_SCRATCH_DIR or the cache)",
+        show_default=False,
+    ),
+    output_format: OutputFormat = FormatOption,
+    timings: bool = TimingsOption,
+    trace: Path | None = TraceOption,
 ) -> None:
-    """Apply the latest template changes to the project."""
+    """Apply the latest template changes to the project.
+
+    With several project directories, projects are updated one after another
+    and a failing project does not stop the rest.
+    """
     from rebake.update import run_update
 
+    project_dirs = project_dirs or [Path(".")]
+    ndjson = output_format == OutputFormat.NDJSON
+    failed = False
+    with _instrumented("update", project_dirs, timings, trace):
+        for project_dir in project_dirs:
+            if len(project_dirs) > 1 and not ndjson:
+                _console().print(f"[bold]{project_dir}[/bold]")
+            result = error = None
+            # Keep stdout for the NDJSON records; progress and prompts go to stderr
+            with (
+                _project_timings() if ndjson else nullcontext({}) as project_timings,
+                redirect_stdout(sys.stderr) if ndjson else nullcontext(),
+            ):
+                try:
+                    result = run_update(project_dir, steps=steps, resume=resume, scratch_dir=scratch_dir)
+                except Exception as e:
+                    error = e
+                    _err_console().print(f"[red]Error:[/red] {e}")
+            failed = failed or error is not None
+            if ndjson and result is not None:
+                _emit(
+                    "update",
+                    project_dir,
+                    result.status.value,
+                    old_commit=result.old_commit,
+                    new_commit=result.new_commit,
+                    changed_files=result.changed_files,
+                    rejected_files=result.rejected_files,
+                    timings=project_timings,
+                )
+            elif ndjson:
+                _emit("update", project_dir, "error", error=error, timings=project_timings)
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def drift(
+    project_dir: Path = typer.Argument(Path("."), help="Path to the project directory"),
+) -> None:
+    """List generated files that were modified or deleted since the last update."""
+    from rebake.manifest import Manifest
+
+    try:
+        drifted = Manifest.load(project_dir).drift(project_dir)
+    except FileNotFoundError as e:
+        _err_console().print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(code=2)
+
+    if not drifted:
+        _console().print("[green]✓[/green] No generated files have been modified.")
+        raise typer.Exit(code=0)
+    for path, state in drifted.items():
+        _console().print(f"  [yellow]{state.value:8}[/yellow] {path}")
+    raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    ttl: float = typer.Option(30.0, help="Seconds a resolved template HEAD is reused before asking the remote again"),
+    refresh_interval: float = typer.Option(60.0, help="Seconds between background refreshes of known templates"),
+) -> None:
+    """Run a daemon that keeps template mirrors, HEADs and renders warm for other rebake commands."""
+    from rebake.daemon import TemplateCache
+    from rebake.daemon import serve as serve_forever
+    from rebake.utils.paths import cache_dir, socket_path
+
+    path = socket_path()
+    cache = TemplateCache(cache_dir() / "daemon", ttl=ttl)
+    _console().print(f"Listening on [bold]{path}[/bold]")
     try:
-        run_update(project_dir)
-    except Exception as e:
-        err_console.print(f"[red]Error:[/red] {e}")
+        serve_forever(path, cache, refresh_interval=refresh_interval)
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        _err_console().print(f"[red]Error:[/red] {e}")
         raise typer.Exit(code=1)
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, cast
+
+from rebake.manifest import Manifest
+from rebake.utils.git import clone_at_commit, generate_diff, get_template_head_commit, has_commit, mirror_template
+from rebake.utils.paths import socket_path
+from rebake.utils.timing import span
+
+DISABLE_ENV = "REBAKE_NO_DAEMON"
+_CONNECT_TIMEOUT = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon answers a request with an error."""
+
+
+def _is_private(path: Path) -> bool:
+    """Return True when path is owned by the current user and inaccessible to anyone else."""
+    st = path.lstat()
+    return st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+def _connect(path: Path) -> socket.socket | None:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(_CONNECT_TIMEOUT)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(op: str, **params: Any) -> Any:
+    """Send a request to a running `rebake serve` daemon and return its result.
+
+    Returns None when no daemon is listening (or $REBAKE_NO_DAEMON is set) so
+    callers can fall back to doing the work in-process. A socket that another
+    user could have created or can reach is ignored the same way, since the
+    daemon's answers are trusted as the template's content.
+    """
+    if os.environ.get(DISABLE_ENV):
+        return None
+    path = socket_path()
+    try:
+        trusted = stat.S_ISSOCK(path.lstat().st_mode) and _is_private(path) and _is_private(path.parent)
+    except FileNotFoundError:
+        return None
+    if not trusted:
+        logger.warning("Ignoring %s: the daemon socket and its directory must be private to the current user", path)
+        return None
+    sock = _connect(path)
+    if sock is None:
+        return None
+    # The daemon has its own working directory, so send local template paths as absolute paths
+    template = params.get("template")
+    if template is not None and Path(template).exists():
+        params["template"] = str(Path(template).resolve())
+
+    with span(f"daemon {op}", category="daemon"), sock, sock.makefile("rwb") as stream:
+        # Requests may clone or render, so only the connect is bounded
+        sock.settimeout(None)
+        stream.write(json.dumps({"op": op, **params}).encode() + b"\n")
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise DaemonError("daemon closed the connection")
+    response = json.loads(line)
+    if not response["ok"]:
+        raise DaemonError(response["error"])
+    return response["result"]
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()[:16]
+
+
+class TemplateCache:
+    """Warm template state shared by every connection to the daemon.
+
+    Holds resolved HEADs (reused for `ttl` seconds), bare mirrors of each
+    template under cache_dir/mirrors, and rendered outputs keyed by
+    template, commit and context under cache_dir/renders.
+    """
+
+    def __init__(self, cache_dir: Path, ttl: float = 30.0, max_renders: int = 64) -> None:
+        self.mirrors_dir = cache_dir / "mirrors"
+        self.renders_dir = cache_dir / "renders"
+        self.ttl = ttl
+        self.max_renders = max_renders
+        self._heads: dict[tuple[str, str | None], tuple[float, str]] = {}
+        self._renders: OrderedDict[str, Path] = OrderedDict()
+        self._templates: set[str] = set()
+        self._lock = threading.Lock()
+        self._mirror_locks: dict[str, threading.Lock] = {}
+        # cookiecutter changes the process CWD while rendering, so renders run one at a time
+        self._render_lock = threading.Lock()
+
+    def head(self, template: str, checkout: str | None = None, fresh: bool = False) -> str:
+        """Return the template's HEAD, reusing one resolved within ttl seconds unless fresh is set."""
+        key = (template, checkout)
+        with self._lock:
+            self._templates.add(template)
+            cached = self._heads.get(key)
+        if not fresh and cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        commit = get_template_head_commit(template, checkout=checkout)
+        with self._lock:
+            self._heads[key] = (time.monotonic(), commit)
+        return commit
+
+    def mirror(self, template: str, commits: list[str] | None = None, fetch: bool = False) -> Path:
+        """Return a local mirror of the template, fetching when asked or when any of commits is missing."""
+        path = self.mirrors_dir / f"{_digest(template)}.git"
+        with self._lock:
+            self._templates.add(template)
+            lock = self._mirror_locks.setdefault(template, threading.Lock())
+        with lock:
+            if fetch or not path.exists() or any(not has_commit(path, c) for c in commits or []):
+                self.mirrors_dir.mkdir(parents=True, exist_ok=True)
+                mirror_template(template, path)
+        return path
+
+    def render(self, template: str, commit: str, context: dict[str, Any]) -> Path:
+        from rebake.utils.template import render_template
+
+        key = _digest(json.dumps([template, commit, context], sort_keys=True))
+        mirror = self.mirror(template, [commit])
+        with self._render_lock:
+            with self._lock:
+                if key in self._renders:
+                    self._renders.move_to_end(key)
+                    return self._renders[key]
+
+            dest = self.renders_dir / key
+            if dest.exists():  # left over from an earlier daemon
+                shutil.rmtree(dest)
+            dest.mkdir(parents=True)
+            with tempfile.TemporaryDirectory() as tmpdir:
+                checkout = Path(tmpdir) / "template"
+                clone_at_commit(str(mirror), commit, checkout)
+                rendered = render_template(checkout, context, dest)
+
+            with self._lock:
+                self._renders[key] = rendered
+                while len(self._renders) > self.max_renders:
+                    evicted, _ = self._renders.popitem(last=False)
+                    shutil.rmtree(self.renders_dir / evicted, ignore_errors=True)
+        return rendered
+
+    def diff(self, template: str, old_commit: str, new_commit: str, context: dict[str, Any]) -> str:
+        return generate_diff(self.render(template, old_commit, context), self.render(template, new_commit, context))
+
+    def manifest(self, template: str, commit: str, context: dict[str, Any], skip: list[str] | None = None) -> Manifest:
+        return Manifest.from_tree(self.render(template, commit, context), commit, skip)
+
+    def refresh(self) -> None:
+        """Re-resolve known HEADs and fetch known mirrors so later requests hit warm state."""
+        with self._lock:
+            heads = list(self._heads)
+            templates = set(self._templates)
+        # One failing template (unreachable remote, git timeout, ...) must not end the refresh loop
+        for template, checkout in heads:
+            try:
+                commit = get_template_head_commit(template, checkout=checkout)
+            except Exception:
+                logger.warning("Failed to refresh the HEAD of %s", template, exc_info=True)
+                continue
+            with self._lock:
+                self._heads[(template, checkout)] = (time.monotonic(), commit)
+        for template in templates:
+            if (self.mirrors_dir / f"{_digest(template)}.git").exists():
+                try:
+                    self.mirror(template, fetch=True)
+                except Exception:
+                    logger.warning("Failed to refresh the mirror of %s", template, exc_info=True)
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, cache: TemplateCache) -> None:
+        self.cache = cache
+        super().__init__(str(path), _Handler)
+
+    def dispatch(self, req: dict[str, Any]) -> Any:
+        op = req.get("op")
+        if op == "ping":
+            return {"pid": os.getpid()}
+        if op == "head":
+            return self.cache.head(req["template"], req.get("checkout"), req.get("fresh", False))
+        if op == "mirror":
+            return str(self.cache.mirror(req["template"], req.get("commits")))
+        if op == "diff":
+            return self.cache.diff(req["template"], req["old_commit"], req["new_commit"], req["context"])
+        if op == "manifest":
+            return self.cache.manifest(req["template"], req["new_commit"], req["context"], req.get("skip")).to_dict()
+        raise ValueError(f"unknown op: {op}")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server = cast(_Server, self.server)
+        for line in self.rfile:
+            try:
+                response = {"ok": True, "result": server.dispatch(json.loads(line))}
+            except Exception as e:
+                response = {"ok": False, "error": str(e) or type(e).__name__}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+            self.wfile.flush()
+
+
+def serve(
+    path: Path,
+    cache: TemplateCache,
+    refresh_interval: float = 60.0,
+    on_ready: Callable[[socketserver.BaseServer], None] | None = None,
+) -> None:
+    """Serve requests on the Unix socket at path until interrupted or shut down.
+
+    A background thread refreshes known templates every refresh_interval seconds.
+    on_ready receives the server once it is listening; calling its shutdown() stops serving.
+    The socket's directory is created if needed and must be private to the current user.
+    """
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not _is_private(path.parent):
+        raise RuntimeError(f"{path.parent} must be owned by the current user and not accessible to others")
+    if path.exists():
+        sock = _connect(path)
+        if sock is not None:
+            sock.close()
+            raise RuntimeError(f"A rebake daemon is already listening on {path}")
+        path.unlink()
+
+    # The daemon renders templates (and runs their hooks) on behalf of clients, so only the owner may connect
+    umask = os.umask(0o177)
+    try:
+        server = _Server(path, cache)
+    finally:
+        os.umask(umask)
+    stop = threading.Event()
+
+    def refresh_loop() -> None:
+        while not stop.wait(refresh_interval):
+            cache.refresh()
+
+    threading.Thread(target=refresh_loop, daemon=True).start()
+    if on_ready is not None:
+        on_ready(server)
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+        path.unlink(missing_ok=True)
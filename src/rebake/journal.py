@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from rebake.utils.paths import scratch_dir
+
+JOURNAL_FILE = "journal.json"
+JOURNAL_VERSION = 2
+
+# Phases of an update, in the order they complete
+CLONED = "cloned"
+PROMPTED = "prompted"
+RENDERED = "rendered"
+DIFFED = "diffed"
+
+
+@dataclass
+class Journal:
+    """Persisted progress of one project's update, kept until the update finishes.
+
+    The journal directory doubles as the update's work directory, so the
+    template clones, rendered trees and patch of an interrupted run survive
+    and `rebake update --resume` can continue after the last completed phase.
+    """
+
+    path: Path
+    template: str = ""
+    checkout: str | None = None
+    old_commit: str = ""
+    new_commit: str = ""
+    project_head: str | None = None
+    # StepMode value of a step-wise update, whose template clone keeps its history
+    steps: str | None = None
+    context: dict[str, Any] | None = None
+    old_rendered: str | None = None
+    new_rendered: str | None = None
+    phases: list[str] = field(default_factory=list)
+
+    @classmethod
+    def for_project(cls, project_dir: Path, root: Path | None = None) -> "Journal":
+        """Load the journal of an earlier update of project_dir, or start an empty one.
+
+        Journals live under root, which defaults to scratch_dir().
+        """
+        digest = hashlib.sha256(str(project_dir.resolve()).encode()).hexdigest()[:16]
+        path = (root or scratch_dir()) / digest
+        journal_file = path / JOURNAL_FILE
+        if journal_file.exists():
+            data = json.loads(journal_file.read_text())
+            if data.pop("version", None) == JOURNAL_VERSION:
+                return cls(path=path, **data)
+        return cls(path=path)
+
+    @property
+    def old_template(self) -> Path:
+        return self.path / "old_template"
+
+    @property
+    def new_template(self) -> Path:
+        return self.path / "new_template"
+
+    @property
+    def patch_file(self) -> Path:
+        return self.path / "patch.diff"
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.path / "manifest.json"
+
+    def done(self, phase: str) -> bool:
+        return phase in self.phases
+
+    def matches(self, template: str, checkout: str | None, old_commit: str, steps: str | None = None) -> bool:
+        """Return True when the journal was written for the same kind of update from the same starting point."""
+        started = (self.template, self.checkout, self.old_commit, self.steps)
+        return bool(self.phases) and started == (template, checkout, old_commit, steps)
+
+    def is_current(self, new_commit: str, project_head: str | None) -> bool:
+        """Return True unless the template HEAD or the project HEAD moved since the journal was written."""
+        return (self.new_commit, self.project_head) == (new_commit, project_head)
+
+    def record(self, phase: str, **fields: Any) -> None:
+        """Mark phase as complete, updating fields, and persist the journal."""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        if phase not in self.phases:
+            self.phases.append(phase)
+        data = {"version": JOURNAL_VERSION, **asdict(self)}
+        del data["path"]
+        tmp = self.path / f"{JOURNAL_FILE}.tmp"
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n")
+        tmp.replace(self.path / JOURNAL_FILE)
+
+    def reset(self) -> "Journal":
+        """Discard all recorded progress and artifacts; return an empty journal with a fresh work directory."""
+        self.discard()
+        self.path.mkdir(parents=True)
+        return Journal(path=self.path)
+
+    def discard(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from enum import Enum
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any
+
+from rebake.utils.paths import cache_dir
+
+MANIFEST_FILE = ".rebake-manifest.json"
+MANIFEST_VERSION = 1
+
+
+class FileState(Enum):
+    MODIFIED = "modified"
+    DELETED = "deleted"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stamps_file(project_dir: Path) -> Path:
+    key = hashlib.sha256(str(project_dir.resolve()).encode()).hexdigest()[:16]
+    return cache_dir() / "stamps" / f"{key}.json"
+
+
+def _load_stamps(project_dir: Path) -> tuple[dict[str, tuple[str, int]], int]:
+    """Return the project's stamps (path -> (sha256, mtime_ns)) and when they were written."""
+    stamps_file = _stamps_file(project_dir)
+    try:
+        saved_ns = stamps_file.stat().st_mtime_ns
+        data = json.loads(stamps_file.read_text())
+    except (OSError, ValueError):
+        return {}, 0
+    return {rel: (sha256, mtime_ns) for rel, (sha256, mtime_ns) in data.items()}, saved_ns
+
+
+def _is_skipped(rel: str, skip: list[str] | None) -> bool:
+    """Return True when rel, or any directory containing it, matches a skip pattern.
+
+    As in cruft, a pattern naming a directory ("tests" or "tests/") skips everything under it.
+    """
+    patterns = [pattern.rstrip("/") for pattern in skip or []]
+    parts = rel.split("/")
+    prefixes = ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+    return any(fnmatch(prefix, pattern) for prefix in prefixes for pattern in patterns)
+
+
+@dataclass
+class Manifest:
+    """Content hashes of the files the template rendered at `commit`.
+
+    Stored next to .cruft.json so that drift can be detected with a stat per
+    file instead of a full re-render: a file whose size and mtime match its
+    local stamp is not read, and other files are hashed only when their size
+    matches.
+    """
+
+    commit: str
+    # relative POSIX path -> (sha256, size)
+    files: dict[str, tuple[str, int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_tree(cls, root: Path, commit: str, skip: list[str] | None = None) -> "Manifest":
+        files: dict[str, tuple[str, int]] = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            rel_dir = Path(dirpath).relative_to(root).as_posix()
+            dirnames[:] = [
+                d for d in dirnames if d != ".git" and not _is_skipped(f"{rel_dir}/{d}".removeprefix("./"), skip)
+            ]
+            for name in filenames:
+                path = Path(dirpath) / name
+                rel = path.relative_to(root).as_posix()
+                if not path.is_file() or _is_skipped(rel, skip):
+                    continue
+                files[rel] = (_sha256(path), path.stat().st_size)
+        return cls(commit=commit, files=dict(sorted(files.items())))
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Manifest":
+        # Version 2 manifests also carried mtime stamps, which are now kept out of the project
+        files = {k: (v[0], v[1]) for k, v in data["files"].items()}
+        return cls(commit=data["commit"], files=files)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"version": MANIFEST_VERSION, "commit": self.commit, "files": self.files}
+
+    @classmethod
+    def load(cls, project_dir: Path = Path(".")) -> "Manifest":
+        manifest_file = project_dir / MANIFEST_FILE
+        if not manifest_file.exists():
+            raise FileNotFoundError(f"{MANIFEST_FILE} not found in {project_dir}; run `rebake update` to create it")
+        return cls.from_dict(json.loads(manifest_file.read_text()))
+
+    def save(self, project_dir: Path = Path(".")) -> None:
+        # One file per line keeps the manifest compact and its git diffs readable
+        lines = [f"    {json.dumps(path, ensure_ascii=False)}: {json.dumps(list(e))}" for path, e in self.files.items()]
+        files = "{\n" + ",\n".join(lines) + "\n  }" if lines else "{}"
+        text = f'{{\n  "version": {MANIFEST_VERSION},\n  "commit": {json.dumps(self.commit)},\n  "files": {files}\n}}\n'
+        (project_dir / MANIFEST_FILE).write_text(text)
+
+    def stamp(self, project_dir: Path = Path(".")) -> None:
+        """Record the mtime of each project file whose content matches the rendered output.
+
+        The stamps describe this checkout only, so they are kept under the
+        cache directory, keyed by project path, rather than in the committed
+        manifest. drift() trusts an unchanged size and mtime instead of
+        hashing the file.
+        """
+        stamps: dict[str, tuple[str, int]] = {}
+        for rel, (sha256, size) in self.files.items():
+            path = project_dir / rel
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if st.st_size == size and _sha256(path) == sha256:
+                stamps[rel] = (sha256, st.st_mtime_ns)
+        stamps_file = _stamps_file(project_dir)
+        stamps_file.parent.mkdir(parents=True, exist_ok=True)
+        staging = stamps_file.with_name(f".{stamps_file.name}.{os.getpid()}")
+        staging.write_text(json.dumps(stamps))
+        os.replace(staging, stamps_file)
+
+    def drift(self, project_dir: Path = Path(".")) -> dict[str, FileState]:
+        """Return the files whose working-tree copy no longer matches the rendered output."""
+        # Like git's racily-clean check: an edit in the same timestamp tick as the stamp keeps the mtime
+        stamps, saved_ns = _load_stamps(project_dir)
+        drifted: dict[str, FileState] = {}
+        for rel, (sha256, size) in self.files.items():
+            path = project_dir / rel
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                drifted[rel] = FileState.DELETED
+                continue
+            if st.st_size != size:
+                drifted[rel] = FileState.MODIFIED
+            elif stamps.get(rel) == (sha256, st.st_mtime_ns) and st.st_mtime_ns < saved_ns:
+                continue
+            elif _sha256(path) != sha256:
+                drifted[rel] = FileState.MODIFIED
+        return drifted
@@ -1,90 +1,471 @@
 from __future__ import annotations
 
-import tempfile
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+from dataclasses import dataclass, field
+from enum import Enum
 from pathlib import Path
+from typing import Any
 
+from cookiecutter import __version__ as cookiecutter_version
 from rich.console import Console
 
+from rebake import daemon
 from rebake.config import CruftConfig
+from rebake.journal import CLONED, DIFFED, PROMPTED, RENDERED, Journal
+from rebake.manifest import Manifest
 from rebake.utils.git import (
     apply_patch,
-    clone_at_commit,
+    checkout,
+    clone_at_commit_async,
     generate_diff,
-    get_template_head_commit,
-    is_working_tree_clean,
+    get_template_head_commit_async,
+    head_commit_async,
+    is_working_tree_clean_async,
+    run_sync,
+    step_commits,
 )
+from rebake.utils.materialize import load_tree, mark_used, prune, store_tree
+from rebake.utils.paths import cache_dir
+from rebake.utils.steps import StepMode
 from rebake.utils.template import render_template
+from rebake.utils.timing import active_recorder, span, tree_stats
 from rebake.utils.variables import detect_new_variables, prompt_new_variables
 
 console = Console()
 
+# Least recently used checkouts and renders beyond these limits are evicted from the cache
+MAX_CACHED_CHECKOUTS = int(os.environ.get("REBAKE_MAX_CACHED_CHECKOUTS", "32"))
+MAX_CACHED_RENDERS = int(os.environ.get("REBAKE_MAX_CACHED_RENDERS", "64"))
 
-def run_update(project_dir: Path = Path(".")) -> None:
-    """Apply the latest template changes to the project.
 
-    Raises RuntimeError when the working tree has uncommitted changes.
+class UpdateStatus(Enum):
+    UP_TO_DATE = "up-to-date"
+    UPDATED = "updated"
+    CONFLICTS = "conflicts"
+
+
+@dataclass
+class UpdateResult:
+    """What an update did to one project."""
+
+    old_commit: str
+    new_commit: str
+    # Project-relative paths touched by the applied patch(es)
+    changed_files: list[str] = field(default_factory=list)
+    # Project-relative paths whose hunks were rejected (left as <path>.rej)
+    rejected_files: list[str] = field(default_factory=list)
+    applied: bool = True
+
+    @property
+    def status(self) -> UpdateStatus:
+        if not self.applied:
+            return UpdateStatus.CONFLICTS
+        if self.changed_files or self.new_commit != self.old_commit:
+            return UpdateStatus.UPDATED
+        return UpdateStatus.UP_TO_DATE
+
+
+def _record_tree(stats: dict[str, object], path: Path) -> None:
+    if active_recorder() is not None:
+        stats.update(tree_stats(path))
+
+
+def _ask_daemon(op: str, **params: Any) -> Any:
+    """Send a request to the daemon, returning None when none is running or the request fails.
+
+    Either way the caller does the work in-process, so a failing daemon never aborts an update.
     """
-    # Resolve to absolute path before any subprocess/cookiecutter calls that may change CWD
-    project_dir = project_dir.resolve()
+    try:
+        return daemon.request(op, **params)
+    except (daemon.DaemonError, OSError, ValueError) as e:
+        console.print(f"[yellow]![/yellow] The rebake daemon failed ({e}); continuing without it.")
+        return None
 
-    if not is_working_tree_clean(project_dir):
-        raise RuntimeError("Project has uncommitted changes. Please commit or stash them before updating.")
 
-    config = CruftConfig.load(project_dir)
-    old_commit = config.commit
-    new_commit = get_template_head_commit(config.template, checkout=config.checkout)
+async def _resolve_head(config: CruftConfig) -> str:
+    with span("resolve", template=config.template):
+        # Updating to (or resuming against) a stale HEAD would be wrong, so bypass the daemon's TTL
+        new_commit = await asyncio.to_thread(
+            _ask_daemon, "head", template=config.template, checkout=config.checkout, fresh=True
+        )
+        if new_commit is None:
+            new_commit = await get_template_head_commit_async(config.template, checkout=config.checkout)
+    return new_commit
 
-    console.print(f"Updating from [cyan]{old_commit[:8]}[/cyan] → [cyan]{new_commit[:8]}[/cyan]")
 
-    old_context = config.context.get("cookiecutter", {})
+async def _clone(label: str, template_source: str, commit: str, dest: Path) -> None:
+    with span(label, commit=commit) as stats:
+        await clone_at_commit_async(template_source, commit, dest)
+        _record_tree(stats, dest)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp = Path(tmpdir)
 
-        # Clone template at old and new commits to compute the diff
-        old_template_dir = tmp / "old_template"
-        new_template_dir = tmp / "new_template"
-        clone_at_commit(config.template, old_commit, old_template_dir)
-        clone_at_commit(config.template, new_commit, new_template_dir)
+def _cache_key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
 
-        # Detect variables added in the new template and prompt the user
-        new_vars = detect_new_variables(new_template_dir, old_context)
-        extra_context = {}
-        if new_vars:
-            console.print("[yellow]New template variables detected. Please provide values:[/yellow]")
-            extra_context = prompt_new_variables(new_vars)
 
-        merged_context = {**old_context, **extra_context}
+async def _checkout(label: str, template: str, template_source: str, commit: str, dest: Path) -> None:
+    """Materialize the template's files at commit into dest, cloning only on a checkout cache miss.
 
-        # Render both template versions with the merged context
-        old_output = tmp / "old_output"
-        new_output = tmp / "new_output"
-        old_output.mkdir()
-        new_output.mkdir()
-        old_rendered = render_template(old_template_dir, merged_context, old_output)
-        new_rendered = render_template(new_template_dir, merged_context, new_output)
+    Cached checkouts are keyed by template and commit and hold no .git
+    directory; dest shares their file data through hardlinks or reflinks.
+    Only the MAX_CACHED_CHECKOUTS most recently used checkouts are kept.
+    """
+    root = cache_dir() / "checkouts"
+    entry = root / _cache_key(template) / commit
+    with span(label, commit=commit) as stats:
+        if await asyncio.to_thread(load_tree, entry, dest):
+            stats["cached"] = True
+            mark_used(entry)
+        else:
+            await clone_at_commit_async(template_source, commit, dest)
+            shutil.rmtree(dest / ".git", ignore_errors=True)
+            await asyncio.to_thread(store_tree, dest, entry)
+            await asyncio.to_thread(prune, root, "*/*", MAX_CACHED_CHECKOUTS)
+        _record_tree(stats, dest)
 
-        patch = generate_diff(old_rendered, new_rendered)
 
-    if patch:
-        success, stderr = apply_patch(patch, project_dir)
-        if not success:
-            rej_files = sorted(project_dir.rglob("*.rej"))
-            console.print("[yellow]![/yellow] Some hunks could not be applied.")
-            if rej_files:
-                console.print("Resolve conflicts and delete the following [bold].rej[/bold] files:")
-                for f in rej_files:
-                    console.print(f"  [bold]{f.relative_to(project_dir)}[/bold]")
-            if stderr:
-                console.print(stderr)
+async def _prepare(
+    project_dir: Path, journal: Journal, steps: StepMode | None = None
+) -> tuple[CruftConfig, str, Journal, bool]:
+    """Check the working tree, resolve the new template commit and check out the template.
+
+    Independent steps overlap: git status runs alongside config loading and
+    ls-remote, and the old template is checked out while the new HEAD is
+    resolved. Checkouts are reused from the journal when it belongs to the
+    same update and neither the template HEAD nor the project HEAD has moved;
+    otherwise the journal is reset. For a step-wise update, the new template
+    is a full clone whose history can be walked instead of a cached checkout,
+    and the old template is not checked out at all; a journal is only resumed
+    by an update with the same step mode. Returns the config, the new commit,
+    the journal and whether the rest of the update should ask the daemon to
+    render and diff.
+    """
+    tasks: list[asyncio.Task[Any]] = []
+    need_history = steps is not None
+    step_mode = None if steps is None else steps.value
+
+    def checkout_old_in_background(source: str) -> None:
+        if not need_history and not journal.old_template.exists():
+            old = _checkout("checkout old", config.template, source, config.commit, journal.old_template)
+            tasks.append(asyncio.create_task(old))
+
+    try:
+        clean = asyncio.create_task(is_working_tree_clean_async(project_dir))
+        project_head = asyncio.create_task(head_commit_async(project_dir))
+        tasks += [clean, project_head]
+        config = CruftConfig.load(project_dir)
+        head = asyncio.create_task(_resolve_head(config))
+        tasks.append(head)
+        if not await clean:
+            raise RuntimeError("Project has uncommitted changes. Please commit or stash them before updating.")
+
+        resumable = journal.done(CLONED) and journal.matches(config.template, config.checkout, config.commit, step_mode)
+        if not resumable:
+            journal = journal.reset()
+
+        # A running `rebake serve` daemon keeps a local mirror, so clone from it instead of the remote.
+        # It also renders the old version itself, so the old template is only checked out without one.
+        # Whether to use the daemon is decided here; a later failed request falls back to in-process work.
+        mirror = await asyncio.to_thread(_ask_daemon, "mirror", template=config.template, commits=[config.commit])
+        if mirror is None:
+            checkout_old_in_background(config.template)
+
+        new_commit = await head
+        if resumable and not journal.is_current(new_commit, await project_head):
+            console.print(
+                "[yellow]![/yellow] Template or project HEAD moved since the interrupted update; starting over."
+            )
+            journal = journal.reset()
+            resumable = False
+            if mirror is None:
+                checkout_old_in_background(config.template)
+
+        if resumable:
+            console.print("Resuming the interrupted update.")
+        else:
+            if mirror is not None:
+                mirror = await asyncio.to_thread(_ask_daemon, "mirror", template=config.template, commits=[new_commit])
+            source = mirror or config.template
+            if need_history:
+                await _clone("clone new", source, new_commit, journal.new_template)
+            else:
+                await _checkout("checkout new", config.template, source, new_commit, journal.new_template)
+        await asyncio.gather(*tasks)
+        if not resumable:
+            journal.record(
+                CLONED,
+                template=config.template,
+                checkout=config.checkout,
+                old_commit=config.commit,
+                new_commit=new_commit,
+                project_head=await project_head,
+                steps=step_mode,
+            )
+        return config, new_commit, journal, mirror is not None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _fresh_dir(path: Path) -> Path:
+    # Work directories may hold output from an interrupted run, which cookiecutter refuses to overwrite
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    return path
+
+
+def _render(label: str, template: str, commit: str, template_dir: Path, context: dict[str, Any], output: Path) -> Path:
+    """Render template_dir into output, materializing a cached render of the same commit and context if any.
+
+    A cache hit does not run the template's hooks again. Renders are keyed by
+    the cookiecutter version too, and only the MAX_CACHED_RENDERS most
+    recently used are kept.
+    """
+    root = cache_dir() / "renders"
+    entry = root / _cache_key(template, commit, context, cookiecutter_version)
+    with span(label, commit=commit) as stats:
+        _fresh_dir(output)
+        if load_tree(entry, output):
+            stats["cached"] = True
+            mark_used(entry)
+            rendered = output / next(output.iterdir()).name
         else:
-            console.print("[green]✓[/green] Patch applied successfully.")
+            rendered = render_template(template_dir, context, _fresh_dir(output))
+            if rendered.parent == output:
+                store_tree(output, entry)
+                prune(root, "*", MAX_CACHED_RENDERS)
+        _record_tree(stats, rendered)
+    return rendered
+
+
+def _render_both(config: CruftConfig, new_commit: str, context: dict[str, Any], journal: Journal) -> tuple[Path, Path]:
+    """Render both template checkouts with the same context; return the old and new project directories."""
+    old_rendered = _render(
+        "render old", config.template, config.commit, journal.old_template, context, journal.path / "old_output"
+    )
+    new_rendered = _render(
+        "render new", config.template, new_commit, journal.new_template, context, journal.path / "new_output"
+    )
+    return old_rendered, new_rendered
+
+
+def _journaled_diff(
+    config: CruftConfig, new_commit: str, context: dict[str, Any], journal: Journal, use_daemon: bool = False
+) -> tuple[str, Manifest]:
+    """Return the update patch and the new manifest, reusing whatever the journal already holds.
+
+    With use_daemon, the daemon renders and diffs both versions; when it
+    cannot, both are rendered here, checking out the old template first if
+    _prepare left that to the daemon.
+    """
+    if journal.done(DIFFED):
+        manifest = Manifest.from_dict(json.loads(journal.manifest_file.read_text()))
+        return journal.patch_file.read_text(), manifest
+
+    render_args = {"template": config.template, "new_commit": new_commit, "context": context}
+    patch = manifest_data = None
+    if use_daemon:
+        patch = _ask_daemon("diff", old_commit=config.commit, **render_args)
+        if patch is not None:
+            manifest_data = _ask_daemon("manifest", skip=config.skip, **render_args)
+    if patch is not None and manifest_data is not None:
+        manifest = Manifest.from_dict(manifest_data)
     else:
+        if journal.done(RENDERED) and journal.old_rendered and journal.new_rendered:
+            old_rendered, new_rendered = Path(journal.old_rendered), Path(journal.new_rendered)
+        else:
+            if not journal.old_template.exists():
+                old = _checkout("checkout old", config.template, config.template, config.commit, journal.old_template)
+                run_sync(old)
+            old_rendered, new_rendered = _render_both(config, new_commit, context, journal)
+            journal.record(RENDERED, old_rendered=str(old_rendered), new_rendered=str(new_rendered))
+        with span("diff") as stats:
+            patch = generate_diff(old_rendered, new_rendered)
+            stats["bytes"] = len(patch)
+        manifest = Manifest.from_tree(new_rendered, new_commit, config.skip)
+
+    journal.patch_file.write_text(patch)
+    journal.manifest_file.write_text(json.dumps(manifest.to_dict()))
+    journal.record(DIFFED)
+    return patch, manifest
+
+
+# git quotes paths with special or non-ASCII characters C-style: diff --git "a/\303\251.txt" "b/\303\251.txt"
+_QUOTED_HEADER = re.compile(r'diff --git "a/((?:[^"\\]|\\.)*)"')
+_ESCAPE = re.compile(rb"\\([0-7]{3}|.)")
+_ESCAPES = {b"a": b"\a", b"b": b"\b", b"t": b"\t", b"n": b"\n", b"v": b"\v", b"f": b"\f", b"r": b"\r"}
+
+
+def _unquote(path: str) -> str:
+    """Decode a path git quoted C-style; octal escapes are the bytes of its UTF-8 encoding."""
+    raw = _ESCAPE.sub(
+        lambda m: bytes([int(m[1], 8)]) if len(m[1]) == 3 else _ESCAPES.get(m[1], m[1]), os.fsencode(path)
+    )
+    return os.fsdecode(raw)
+
+
+def _patch_files(patch: str) -> list[str]:
+    """Return the paths a patch from generate_diff touches."""
+    files = []
+    for line in patch.splitlines():
+        if match := _QUOTED_HEADER.match(line):
+            files.append(_unquote(match[1]))
+            continue
+        if not line.startswith("diff --git a/"):
+            continue
+        # Both sides name the same path ("a/<path> b/<path>"), which may itself contain " b/"
+        rest = line[len("diff --git a/") :]
+        half = (len(rest) - len(" b/")) // 2
+        if rest[half : half + len(" b/")] == " b/":
+            files.append(rest[:half])
+    return files
+
+
+def _apply(patch: str, project_dir: Path) -> tuple[bool, list[str]]:
+    """Apply a patch to the project and report the outcome.
+
+    Returns whether every hunk applied and the files left with rejected hunks.
+    """
+    if not patch:
         console.print("[green]✓[/green] No changes to apply.")
+        return True, []
+
+    with span("apply", bytes=len(patch)):
+        success, stderr = apply_patch(patch, project_dir)
+    if success:
+        console.print("[green]✓[/green] Patch applied successfully.")
+        return True, []
+
+    rej_files = sorted(project_dir.rglob("*.rej"))
+    console.print("[yellow]![/yellow] Some hunks could not be applied.")
+    if rej_files:
+        console.print("Resolve conflicts and delete the following [bold].rej[/bold] files:")
+        for f in rej_files:
+            console.print(f"  [bold]{f.relative_to(project_dir)}[/bold]")
+    if stderr:
+        console.print(stderr)
+    return False, [f.relative_to(project_dir).as_posix().removesuffix(".rej") for f in rej_files]
+
+
+def _apply_steps(
+    project_dir: Path,
+    config: CruftConfig,
+    new_commit: str,
+    steps: StepMode,
+    context: dict[str, Any],
+    tmp: Path,
+) -> tuple[UpdateResult, Manifest]:
+    """Apply the template history between config.commit and new_commit one step at a time.
+
+    Each step's render is the base of the next step's diff, so N steps cost
+    N+1 renders from a single template clone. Stops after the first step that
+    leaves rejected hunks. Returns the result, whose new_commit is the last
+    commit applied, and that commit's manifest.
+    """
+    template_dir = tmp / "new_template"
+    commits = step_commits(template_dir, config.commit, new_commit, steps)
+
+    checkout(template_dir, config.commit)
+    base_output = _fresh_dir(tmp / "old_output")
+    with span("render old") as stats:
+        base = render_template(template_dir, context, base_output)
+        _record_tree(stats, base)
+
+    result = UpdateResult(old_commit=config.commit, new_commit=config.commit)
+    for i, commit in enumerate(commits, 1):
+        console.print(f"[bold]Step {i}/{len(commits)}[/bold] [cyan]{commit[:8]}[/cyan]")
+        checkout(template_dir, commit)
+        output = _fresh_dir(tmp / f"step_{i}")
+        with span("render step", commit=commit) as stats:
+            rendered = render_template(template_dir, context, output)
+            _record_tree(stats, rendered)
+        with span("diff", commit=commit) as stats:
+            patch = generate_diff(base, rendered)
+            stats["bytes"] = len(patch)
+
+        result.new_commit = commit
+        result.changed_files += [f for f in _patch_files(patch) if f not in result.changed_files]
+        result.applied, result.rejected_files = _apply(patch, project_dir)
+        if not result.applied:
+            console.print(
+                f"Stopped at [cyan]{commit[:8]}[/cyan]. "
+                "Commit the resolved conflicts and run the update again to continue from here."
+            )
+            return result, Manifest.from_tree(rendered, commit, config.skip)
+        shutil.rmtree(base_output)
+        base, base_output = rendered, output
+
+    return result, Manifest.from_tree(base, result.new_commit, config.skip)
+
+
+def run_update(
+    project_dir: Path = Path("."),
+    steps: StepMode | None = None,
+    resume: bool = False,
+    scratch_dir: Path | None = None,
+) -> UpdateResult:
+    """Apply the latest template changes to the project and return what changed.
+
+    With steps, the template history is applied one commit (or tagged
+    release) at a time instead of as a single diff. Progress is journaled
+    until the update finishes; with resume, an interrupted update continues
+    after its last completed phase. Work directories live under scratch_dir
+    (default: $REBAKE_SCRATCH_DIR or the cache directory); template checkouts
+    and renders are linked into it from the cache rather than copied.
+
+    Raises RuntimeError when the working tree has uncommitted changes.
+    """
+    # Resolve to absolute path before any subprocess/cookiecutter calls that may change CWD
+    project_dir = project_dir.resolve()
+
+    journal = Journal.for_project(project_dir, scratch_dir)
+    if not resume:
+        journal = journal.reset()
+    config, new_commit, journal, use_daemon = run_sync(_prepare(project_dir, journal, steps))
+    old_commit = config.commit
+    old_context = config.context.get("cookiecutter", {})
+    console.print(f"Updating from [cyan]{old_commit[:8]}[/cyan] → [cyan]{new_commit[:8]}[/cyan]")
+
+    resumable = True
+    try:
+        if journal.done(PROMPTED) and journal.context is not None:
+            merged_context = journal.context
+        else:
+            # Detect variables added in the new template and prompt the user
+            new_vars = detect_new_variables(journal.new_template, old_context)
+            extra_context = {}
+            if new_vars:
+                console.print("[yellow]New template variables detected. Please provide values:[/yellow]")
+                extra_context = prompt_new_variables(new_vars)
+
+            merged_context = {**old_context, **extra_context}
+            journal.record(PROMPTED, context=merged_context)
+
+        if steps is not None:
+            # Steps change the working tree as they go, so from here on --resume would fail the clean-tree check
+            resumable = False
+            result, manifest = _apply_steps(project_dir, config, new_commit, steps, merged_context, journal.path)
+        else:
+            patch, manifest = _journaled_diff(config, new_commit, merged_context, journal, use_daemon)
+            result = UpdateResult(old_commit=old_commit, new_commit=new_commit, changed_files=_patch_files(patch))
+            result.applied, result.rejected_files = _apply(patch, project_dir)
+    except BaseException:
+        if resumable:
+            console.print("[dim]Progress was saved; run `rebake update --resume` to continue.[/dim]")
+        raise
 
     # Persist the new commit hash and any newly prompted variables.
     # Save even on partial apply so the next run starts from the new baseline
     # rather than re-applying the same diff.
-    config.commit = new_commit
+    config.commit = result.new_commit
     config.context["cookiecutter"] = merged_context
     config.save(project_dir)
+    manifest.stamp(project_dir)
+    manifest.save(project_dir)
+    journal.discard()
+    return result
@@ -1,11 +1,108 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import io
+import locale
+import os
+import signal
 import subprocess
 import tempfile
+import weakref
+from collections.abc import Coroutine
 from pathlib import Path
+from typing import Any, TypeVar
 
+from rebake.utils.steps import StepMode
+from rebake.utils.timing import span
 
-def get_template_head_commit(template_url: str, checkout: str | None = None) -> str:
+T = TypeVar("T")
+
+# Upper bound on concurrently running git processes per event loop
+GIT_CONCURRENCY = int(os.environ.get("REBAKE_GIT_CONCURRENCY", "8"))
+# Default per-call timeout in seconds; unset means git may run as long as it needs
+GIT_TIMEOUT = float(os.environ["REBAKE_GIT_TIMEOUT"]) if os.environ.get("REBAKE_GIT_TIMEOUT") else None
+
+_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    # asyncio primitives are bound to one loop, and every sync wrapper runs its own
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(GIT_CONCURRENCY)
+    return _semaphores[loop]
+
+
+def _decode(data: bytes) -> str:
+    # Same decoding and newline translation as subprocess.run(text=True)
+    return io.TextIOWrapper(io.BytesIO(data), encoding=locale.getpreferredencoding(False)).read()
+
+
+async def run_git_async(
+    args: list[str],
+    *,
+    cwd: Path | str | None = None,
+    input: str | bytes | None = None,
+    text: bool = False,
+    check: bool = False,
+    timeout: float | None = None,
+) -> subprocess.CompletedProcess[Any]:
+    """Run a git subcommand with captured output, timing it when recording is active.
+
+    At most GIT_CONCURRENCY git processes run at once per event loop. The process
+    is killed when the call times out (raising subprocess.TimeoutExpired) or the
+    awaiting task is cancelled. Only calls with a timeout run in their own
+    session, so that a timeout also kills helpers such as git-remote-https or
+    ssh; other calls keep the terminal for credential and passphrase prompts.
+    """
+    argv = ["git", *args]
+    timeout = GIT_TIMEOUT if timeout is None else timeout
+    if isinstance(input, str):
+        input = input.encode(locale.getpreferredencoding(False))
+
+    async with _semaphore():
+        with span(f"git {args[0]}", category="git", argv=args) as stats:
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                cwd=None if cwd is None else str(cwd),
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=timeout is not None,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(input), timeout)
+            except BaseException as e:
+                if proc.returncode is None:
+                    with contextlib.suppress(ProcessLookupError):
+                        if timeout is not None:
+                            os.killpg(proc.pid, signal.SIGKILL)
+                        else:
+                            proc.kill()
+                    await asyncio.shield(proc.wait())
+                if isinstance(e, TimeoutError):
+                    raise subprocess.TimeoutExpired(argv, timeout or 0) from e
+                raise
+            assert proc.returncode is not None
+            stats["returncode"] = proc.returncode
+            if input is not None:
+                stats["bytes_in"] = len(input)
+            stats["bytes_out"] = len(stdout)
+
+    out: Any = _decode(stdout) if text else stdout
+    err: Any = _decode(stderr) if text else stderr
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, argv, out, err)
+    return subprocess.CompletedProcess(argv, proc.returncode, out, err)
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine from synchronous code; the blocking helpers below are thin wrappers over this."""
+    return asyncio.run(coro)
+
+
+async def get_template_head_commit_async(template_url: str, checkout: str | None = None) -> str:
     """Return the HEAD commit hash of a remote template repository.
 
     Uses git ls-remote for speed, avoiding a full clone.
@@ -14,12 +111,7 @@ def get_template_head_commit(template_url: str, checkout: str | None = None) ->
     """
     ref = checkout or "HEAD"
     try:
-        result = subprocess.run(
-            ["git", "ls-remote", template_url, ref],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
+        result = await run_git_async(["ls-remote", template_url, ref], text=True, check=True)
         lines = result.stdout.strip().splitlines()
         if lines:
             return lines[0].split("\t")[0]
@@ -27,67 +119,150 @@ def get_template_head_commit(template_url: str, checkout: str | None = None) ->
         pass
 
     # ls-remote returns nothing when checkout is a commit hash, so clone instead
-    return _get_commit_via_clone(template_url, checkout)
+    return await _get_commit_via_clone(template_url, checkout)
+
+
+def get_template_head_commit(template_url: str, checkout: str | None = None) -> str:
+    """Blocking wrapper around get_template_head_commit_async."""
+    return run_sync(get_template_head_commit_async(template_url, checkout=checkout))
 
 
-def _get_commit_via_clone(template_url: str, checkout: str | None) -> str:
+async def _get_commit_via_clone(template_url: str, checkout: str | None) -> str:
     with tempfile.TemporaryDirectory() as tmpdir:
-        clone_args = ["git", "clone", "--depth=1"]
+        clone_args = ["clone", "--depth=1"]
         if checkout:
             clone_args += ["--branch", checkout]
         clone_args += [template_url, tmpdir]
-        subprocess.run(clone_args, capture_output=True, check=True)
-
-        result = subprocess.run(
-            ["git", "rev-parse", "HEAD"],
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=tmpdir,
-        )
+        await run_git_async(clone_args, check=True)
+
+        result = await run_git_async(["rev-parse", "HEAD"], text=True, check=True, cwd=tmpdir)
         return result.stdout.strip()
 
 
-def clone_at_commit(template_url: str, commit: str, dest: Path) -> None:
+async def clone_at_commit_async(template_url: str, commit: str, dest: Path) -> None:
     """Clone the template repository and check out the given commit."""
-    subprocess.run(
-        ["git", "clone", template_url, str(dest)],
-        capture_output=True,
-        check=True,
-    )
-    subprocess.run(
-        ["git", "checkout", commit],
-        capture_output=True,
+    await run_git_async(["clone", template_url, str(dest)], check=True)
+    await checkout_async(dest, commit)
+
+
+def clone_at_commit(template_url: str, commit: str, dest: Path) -> None:
+    """Blocking wrapper around clone_at_commit_async."""
+    run_sync(clone_at_commit_async(template_url, commit, dest))
+
+
+async def checkout_async(repo_dir: Path, commit: str) -> None:
+    """Check out the given commit in an existing clone."""
+    await run_git_async(["checkout", commit], check=True, cwd=repo_dir)
+
+
+def checkout(repo_dir: Path, commit: str) -> None:
+    """Blocking wrapper around checkout_async."""
+    run_sync(checkout_async(repo_dir, commit))
+
+
+async def first_parent_commits_async(repo_dir: Path, old_commit: str, new_commit: str) -> list[str]:
+    """Return the commits on new_commit's first-parent chain that are not in old_commit, oldest first."""
+    result = await run_git_async(
+        ["rev-list", "--first-parent", "--reverse", f"{old_commit}..{new_commit}"],
+        text=True,
         check=True,
-        cwd=str(dest),
+        cwd=repo_dir,
     )
+    return result.stdout.split()
 
 
-def is_working_tree_clean(project_dir: Path = Path(".")) -> bool:
-    """Return True when there are no uncommitted changes in the working tree."""
-    result = subprocess.run(
-        ["git", "status", "--porcelain"],
-        capture_output=True,
+def first_parent_commits(repo_dir: Path, old_commit: str, new_commit: str) -> list[str]:
+    """Blocking wrapper around first_parent_commits_async."""
+    return run_sync(first_parent_commits_async(repo_dir, old_commit, new_commit))
+
+
+async def tagged_commits_async(repo_dir: Path) -> set[str]:
+    """Return the commits that at least one tag points at."""
+    result = await run_git_async(
+        ["for-each-ref", "refs/tags", "--format=%(objectname) %(*objectname)"],
         text=True,
         check=True,
-        cwd=str(project_dir),
+        cwd=repo_dir,
     )
+    commits: set[str] = set()
+    for line in result.stdout.splitlines():
+        # Annotated tags report the tagged commit as the peeled %(*objectname)
+        obj, _, peeled = line.partition(" ")
+        commits.add(peeled or obj)
+    return commits
+
+
+def tagged_commits(repo_dir: Path) -> set[str]:
+    """Blocking wrapper around tagged_commits_async."""
+    return run_sync(tagged_commits_async(repo_dir))
+
+
+async def step_commits_async(repo_dir: Path, old_commit: str, new_commit: str, mode: StepMode) -> list[str]:
+    """Return the commits to apply one at a time to move from old_commit to new_commit, oldest first.
+
+    Walks new_commit's first-parent history; in TAGS mode only tagged commits
+    are kept, plus new_commit itself so the walk always ends at the target.
+    """
+    commits = await first_parent_commits_async(repo_dir, old_commit, new_commit)
+    if mode == StepMode.TAGS:
+        tagged = await tagged_commits_async(repo_dir)
+        commits = [c for c in commits if c in tagged or c == new_commit]
+    return commits
+
+
+def step_commits(repo_dir: Path, old_commit: str, new_commit: str, mode: StepMode) -> list[str]:
+    """Blocking wrapper around step_commits_async."""
+    return run_sync(step_commits_async(repo_dir, old_commit, new_commit, mode))
+
+
+async def mirror_template_async(template_url: str, mirror_dir: Path) -> None:
+    """Create a bare mirror of the template repository, or fetch into an existing one."""
+    if mirror_dir.exists():
+        await run_git_async(["fetch", "--prune", "--tags", "origin"], check=True, cwd=mirror_dir)
+    else:
+        await run_git_async(["clone", "--mirror", template_url, str(mirror_dir)], check=True)
+
+
+def mirror_template(template_url: str, mirror_dir: Path) -> None:
+    """Blocking wrapper around mirror_template_async."""
+    run_sync(mirror_template_async(template_url, mirror_dir))
+
+
+async def has_commit_async(repo_dir: Path, commit: str) -> bool:
+    """Return True when the commit object is present in the local repository."""
+    result = await run_git_async(["cat-file", "-e", f"{commit}^{{commit}}"], cwd=repo_dir)
+    return result.returncode == 0
+
+
+def has_commit(repo_dir: Path, commit: str) -> bool:
+    """Blocking wrapper around has_commit_async."""
+    return run_sync(has_commit_async(repo_dir, commit))
+
+
+async def head_commit_async(repo_dir: Path) -> str | None:
+    """Return the commit checked out in repo_dir, or None when it has no commits yet."""
+    result = await run_git_async(["rev-parse", "--verify", "--quiet", "HEAD"], text=True, cwd=repo_dir)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+async def is_working_tree_clean_async(project_dir: Path = Path(".")) -> bool:
+    """Return True when there are no uncommitted changes in the working tree."""
+    result = await run_git_async(["status", "--porcelain"], text=True, check=True, cwd=project_dir)
     return result.stdout.strip() == ""
 
 
-def _git_root(project_dir: Path) -> Path:
+def is_working_tree_clean(project_dir: Path = Path(".")) -> bool:
+    """Blocking wrapper around is_working_tree_clean_async."""
+    return run_sync(is_working_tree_clean_async(project_dir))
+
+
+async def _git_root(project_dir: Path) -> Path:
     """Return the root of the git worktree containing project_dir."""
-    result = subprocess.run(
-        ["git", "rev-parse", "--show-toplevel"],
-        capture_output=True,
-        text=True,
-        check=True,
-        cwd=str(project_dir),
-    )
+    result = await run_git_async(["rev-parse", "--show-toplevel"], text=True, check=True, cwd=project_dir)
     return Path(result.stdout.strip())
 
 
-def apply_patch(patch: str, project_dir: Path = Path(".")) -> tuple[bool, str]:
+async def apply_patch_async(patch: str, project_dir: Path = Path(".")) -> tuple[bool, str]:
     """Apply a patch string via git apply.
 
     Runs git apply from the git root with --directory so that patch paths
@@ -98,34 +273,27 @@ def apply_patch(patch: str, project_dir: Path = Path(".")) -> tuple[bool, str]:
     applicable hunks are still written and only conflicts end up as .rej files.
     Returns (all_hunks_applied, stderr).
     """
-    git_root = _git_root(project_dir)
+    git_root = await _git_root(project_dir)
     directory = project_dir.relative_to(git_root)
-    cmd_base = ["git", "apply", "--ignore-whitespace"]
+    cmd_base = ["apply", "--ignore-whitespace"]
     # --directory=. causes git to produce invalid paths like ./file.txt
     if directory != Path("."):
         cmd_base.append(f"--directory={directory}")
 
-    result = subprocess.run(
-        [*cmd_base, "-"],
-        input=patch,
-        capture_output=True,
-        text=True,
-        cwd=str(git_root),
-    )
+    result = await run_git_async([*cmd_base, "-"], input=patch, text=True, cwd=git_root)
     if result.returncode == 0:
         return True, ""
 
     # Partial fallback: apply what we can, write .rej files for conflicts
-    result = subprocess.run(
-        [*cmd_base, "--reject", "-"],
-        input=patch,
-        capture_output=True,
-        text=True,
-        cwd=str(git_root),
-    )
+    result = await run_git_async([*cmd_base, "--reject", "-"], input=patch, text=True, cwd=git_root)
     return False, result.stderr
 
 
+def apply_patch(patch: str, project_dir: Path = Path(".")) -> tuple[bool, str]:
+    """Blocking wrapper around apply_patch_async."""
+    return run_sync(apply_patch_async(patch, project_dir))
+
+
 def _common_ancestor(path1: Path, path2: Path) -> Path | None:
     """Return the deepest common directory ancestor of two absolute paths."""
     common_parts: list[str] = []
@@ -139,7 +307,11 @@ def _common_ancestor(path1: Path, path2: Path) -> Path | None:
     return Path(*common_parts)
 
 
-def generate_diff(old_dir: Path, new_dir: Path) -> str:
+# A renamed file is diffed as a deletion and an addition, so every file header names a single path
+_DIFF_ARGS = ["--no-index", "--binary", "--no-renames"]
+
+
+async def generate_diff_async(old_dir: Path, new_dir: Path) -> str:
     """Return a unified diff between two directories as a patch string."""
     old_real = old_dir.resolve()
     new_real = new_dir.resolve()
@@ -149,24 +321,20 @@ def generate_diff(old_dir: Path, new_dir: Path) -> str:
     if common is not None:
         old_rel = str(old_real.relative_to(common))
         new_rel = str(new_real.relative_to(common))
-        result = subprocess.run(
-            ["git", "diff", "--no-index", "--binary", old_rel, new_rel],
-            capture_output=True,
-            text=True,
-            cwd=str(common),
-        )
+        result = await run_git_async(["diff", *_DIFF_ARGS, old_rel, new_rel], text=True, cwd=common)
         raw = result.stdout
         old_prefix = old_rel + "/"
         new_prefix = new_rel + "/"
     else:
-        result = subprocess.run(
-            ["git", "diff", "--no-index", "--binary", str(old_real), str(new_real)],
-            capture_output=True,
-            text=True,
-        )
+        result = await run_git_async(["diff", *_DIFF_ARGS, str(old_real), str(new_real)], text=True)
         raw = result.stdout
         old_prefix = str(old_real) + "/"
         new_prefix = str(new_real) + "/"
 
     # git diff exits with 1 when there are differences; that is expected
     return raw.replace(old_prefix, "").replace(new_prefix, "")
+
+
+def generate_diff(old_dir: Path, new_dir: Path) -> str:
+    """Blocking wrapper around generate_diff_async."""
+    return run_sync(generate_diff_async(old_dir, new_dir))
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+from contextlib import suppress
+from pathlib import Path
+
+from rebake.utils.timing import span
+
+# Linux ioctl that clones a file's extents copy-on-write (btrfs, XFS, bcachefs, ...)
+_FICLONE = 0x40049409
+
+# Written into each cache entry by store_tree; records how many files a complete copy has
+ENTRY_FILE = ".rebake-entry"
+
+
+def _reflink(src: str, dest: str) -> bool:
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+    except OSError:
+        with suppress(FileNotFoundError):
+            os.unlink(dest)
+        return False
+    shutil.copystat(src, dest)
+    return True
+
+
+def materialize_tree(src: Path, dest: Path) -> dict[str, int]:
+    """Recreate the tree at src under dest without copying file data where possible.
+
+    Each file is hardlinked, else reflinked (copy-on-write), else copied; only
+    the last case costs bytes. Callers must treat both trees as read-only,
+    since a hardlinked file is the same file in both places. A cache entry's
+    ENTRY_FILE is not copied. Returns counts of files and of linked,
+    reflinked and copied bytes.
+    """
+    stats = {"files": 0, "linked_bytes": 0, "reflinked_bytes": 0, "copied_bytes": 0}
+    with span("materialize", category="io", src=str(src), dest=str(dest)) as span_stats:
+        # Once a link attempt fails (e.g. across filesystems), skip it for the rest of the tree
+        can_link = can_reflink = True
+        for root, dirs, files in os.walk(src):
+            target_root = dest / os.path.relpath(root, src)
+            target_root.mkdir(parents=True, exist_ok=True)
+            for name in dirs:
+                if os.path.islink(os.path.join(root, name)):
+                    os.symlink(os.readlink(os.path.join(root, name)), target_root / name)
+            for name in files:
+                if name == ENTRY_FILE and target_root == dest:
+                    continue
+                source = os.path.join(root, name)
+                target = str(target_root / name)
+                st = os.lstat(source)
+                stats["files"] += 1
+                if os.path.islink(source):
+                    os.symlink(os.readlink(source), target)
+                    continue
+                if can_link:
+                    try:
+                        os.link(source, target)
+                        stats["linked_bytes"] += st.st_size
+                        continue
+                    except OSError:
+                        can_link = False
+                if can_reflink:
+                    if _reflink(source, target):
+                        stats["reflinked_bytes"] += st.st_size
+                        continue
+                    can_reflink = False
+                shutil.copy2(source, target)
+                stats["copied_bytes"] += st.st_size
+        span_stats.update(stats)
+    return stats
+
+
+def _discard(entry: Path) -> None:
+    """Delete entry after atomically renaming it to a dot-prefixed tombstone.
+
+    A concurrent reader therefore finds the entry either whole or gone, never
+    half deleted (a reader already walking it notices the files go missing).
+    """
+    # rename() may replace an empty directory, so the tombstone's name is reserved first
+    tombstone = Path(tempfile.mkdtemp(dir=entry.parent, prefix=f".{entry.name}.deleted."))
+    with suppress(OSError):
+        os.rename(entry, tombstone)
+    shutil.rmtree(tombstone, ignore_errors=True)
+
+
+def store_tree(src: Path, dest: Path) -> None:
+    """Atomically publish a copy of src at dest, e.g. to populate a cache entry.
+
+    When another process published dest first, its copy wins and ours is
+    discarded. A dest without an ENTRY_FILE (incomplete, or left by an older
+    rebake) is replaced.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=dest.parent, prefix=f".{dest.name}."))
+    try:
+        stats = materialize_tree(src, staging)
+        (staging / ENTRY_FILE).write_text(json.dumps({"files": stats["files"]}))
+        if dest.exists() and not (dest / ENTRY_FILE).exists():
+            _discard(dest)
+        os.rename(staging, dest)
+    except OSError:
+        if not dest.exists():
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def load_tree(entry: Path, dest: Path) -> bool:
+    """Materialize a cache entry published by store_tree into dest.
+
+    Returns False, with dest removed, when the entry is missing or the copy
+    does not hold as many files as the entry recorded (e.g. it was pruned
+    meanwhile), so the caller can treat it as a cache miss.
+    """
+    try:
+        expected = json.loads((entry / ENTRY_FILE).read_text())["files"]
+    except (OSError, ValueError, KeyError):
+        return False
+    try:
+        complete = materialize_tree(entry, dest)["files"] == expected
+    except OSError:
+        complete = False
+    if not complete:
+        shutil.rmtree(dest, ignore_errors=True)
+    return complete
+
+
+def mark_used(entry: Path) -> None:
+    """Bump a cache entry's mtime, which prune() treats as its last use."""
+    with suppress(FileNotFoundError):
+        os.utime(entry)
+
+
+def prune(root: Path, pattern: str, keep: int) -> int:
+    """Delete all but the keep most recently used cache entries matching pattern under root.
+
+    Entries still being published (dot-prefixed staging directories) are left
+    alone, and tombstones a crashed prune left behind are deleted. Returns how
+    many entries were removed.
+    """
+    entries = []
+    for entry in root.glob(pattern):
+        with suppress(FileNotFoundError):
+            if ".deleted." in entry.name and entry.name.startswith("."):
+                shutil.rmtree(entry, ignore_errors=True)
+            elif not entry.name.startswith("."):
+                entries.append((entry.stat().st_mtime_ns, entry))
+    entries.sort(reverse=True)
+    for _, entry in entries[keep:]:
+        _discard(entry)
+        if entry.parent != root:
+            # Drop per-template directories once their last entry is gone
+            with suppress(OSError):
+                entry.parent.rmdir()
+    return max(len(entries) - keep, 0)
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """Return the per-user cache directory ($REBAKE_CACHE_DIR, else $XDG_CACHE_HOME/rebake)."""
+    if env := os.environ.get("REBAKE_CACHE_DIR"):
+        return Path(env)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    return (Path(xdg) if xdg else Path.home() / ".cache") / "rebake"
+
+
+def socket_path() -> Path:
+    """Return the Unix socket the `rebake serve` daemon listens on ($REBAKE_SOCKET overrides).
+
+    The socket lives in a directory private to the user, so the fallback under
+    the shared temp directory gets a per-user subdirectory.
+    """
+    if env := os.environ.get("REBAKE_SOCKET"):
+        return Path(env)
+    if runtime := os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(runtime) / "rebake.sock"
+    return Path(tempfile.gettempdir()) / f"rebake-{os.getuid()}" / "rebake.sock"
+
+
+def scratch_dir() -> Path:
+    """Return where updates keep their work directories ($REBAKE_SCRATCH_DIR, else <cache_dir>/journal)."""
+    if env := os.environ.get("REBAKE_SCRATCH_DIR"):
+        return Path(env)
+    return cache_dir() / "journal"
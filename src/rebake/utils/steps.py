@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from enum import Enum
+
+# Kept apart from rebake.utils.git so the CLI can declare --steps without importing asyncio
+
+
+class StepMode(str, Enum):
+    """Which template commits a step-wise update walks through."""
+
+    COMMITS = "commits"
+    TAGS = "tags"
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    start: float
+    duration: float = 0.0
+    depth: int = 0
+    tid: int = 0
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+class Recorder:
+    """Collects timed spans for one CLI invocation."""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+        self._depth: ContextVar[int] = ContextVar("rebake_span_depth", default=0)
+
+    @contextmanager
+    def span(self, name: str, category: str, args: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        depth = self._depth.get()
+        entry = Span(name, category, time.perf_counter() - self.origin, depth=depth, tid=threading.get_ident())
+        entry.args.update(args)
+        # Append on entry so spans stay ordered by start time, parents before children
+        self.spans.append(entry)
+        token = self._depth.set(depth + 1)
+        try:
+            yield entry.args
+        finally:
+            self._depth.reset(token)
+            entry.duration = time.perf_counter() - self.origin - entry.start
+
+    def to_chrome_trace(self, metadata: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Return the spans in Chrome trace event format (load in chrome://tracing or Perfetto)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": round(s.start * 1_000_000),
+                "dur": round(s.duration * 1_000_000),
+                "pid": pid,
+                "tid": s.tid,
+                "args": s.args,
+            }
+            for s in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata or {}}
+
+    def write_trace(self, path: Path, metadata: dict[str, Any] | None = None) -> None:
+        path.write_text(json.dumps(self.to_chrome_trace(metadata), ensure_ascii=False) + "\n")
+
+
+_recorder: ContextVar[Recorder | None] = ContextVar("rebake_recorder", default=None)
+
+
+def active_recorder() -> Recorder | None:
+    return _recorder.get()
+
+
+@contextmanager
+def recording() -> Iterator[Recorder]:
+    """Activate a Recorder so that span() calls made inside the block are collected."""
+    recorder = Recorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def span(name: str, category: str = "phase", **args: Any) -> Iterator[dict[str, Any]]:
+    """Time the enclosed block when recording is active.
+
+    Yields a dict the caller can fill with measurements (bytes, files, ...);
+    without an active recorder this is a no-op and the dict is discarded.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        yield {}
+        return
+    with recorder.span(name, category, args) as span_args:
+        yield span_args
+
+
+def tree_stats(path: Path) -> dict[str, int]:
+    """Return file count and total size of a directory tree, skipping .git.
+
+    Only called while recording, since walking a large render is not free.
+    """
+    files = 0
+    size = 0
+    for root, dirs, names in os.walk(path):
+        if ".git" in dirs:
+            dirs.remove(".git")
+        for name in names:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+            files += 1
+    return {"files": files, "bytes": size}
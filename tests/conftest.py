@@ -8,7 +8,7 @@ from pathlib import Path
 import pytest
 from cookiecutter.main import cookiecutter
 
-FIXTURES_DIR = Path(__file__).parent / "fixtures"
+FIXTURES_DIR = Path(__file__).parent / "e2e" / "fixtures"
 
 
 def _git(args: list[str], cwd: Path) -> None:
@@ -72,3 +72,12 @@ def project_dir(tmp_path: Path, template_repo: Path) -> Path:
     _git(["commit", "-m", "init project"], project)
 
     return project
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    # Update journals and daemon state must not leak into the user's cache, and
+    # a `rebake serve` running on the host must not answer for the tests
+    monkeypatch.setenv("REBAKE_CACHE_DIR", str(tmp_path_factory.mktemp("rebake-cache")))
+    monkeypatch.setenv("REBAKE_SOCKET", str(tmp_path_factory.mktemp("rebake-run") / "rebake.sock"))
+    monkeypatch.delenv("REBAKE_NO_DAEMON", raising=False)
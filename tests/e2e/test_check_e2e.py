@@ -32,3 +32,25 @@ def test_check_outdated(project_dir: Path, template_repo: Path) -> None:
 def test_check_missing_cruft_json(tmp_path: Path) -> None:
     result = runner.invoke(app, ["check", str(tmp_path)])
     assert result.exit_code == 2
+
+
+@pytest.mark.e2e
+def test_check_multiple_projects(project_dir: Path, tmp_path: Path) -> None:
+    result = runner.invoke(app, ["check", str(project_dir), str(tmp_path / "missing")])
+    assert result.exit_code == 2
+    assert "up-to-date" in result.output
+    assert "not found" in result.output
+
+
+@pytest.mark.e2e
+def test_check_ndjson(project_dir: Path, tmp_path: Path) -> None:
+    result = runner.invoke(app, ["check", "--format", "ndjson", str(project_dir), str(tmp_path / "missing")])
+    assert result.exit_code == 2
+
+    records = {r["project"]: r for r in map(json.loads, result.stdout.splitlines())}
+    ok = records[str(project_dir)]
+    assert ok["status"] == "up-to-date"
+    assert ok["old_commit"] == ok["new_commit"]
+    assert ok["changed_files"] is None
+    assert "total_ms" in ok["timings"]
+    assert records[str(tmp_path / "missing")]["status"] == "error"
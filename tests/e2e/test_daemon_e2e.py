@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import os
+import socket
+import subprocess
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from typer.testing import CliRunner
+
+from rebake import daemon
+from rebake.cli import app
+from rebake.daemon import TemplateCache, serve
+from rebake.utils.paths import socket_path
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def template_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[TemplateCache]:
+    socket_file = tmp_path / "run" / "rebake.sock"
+    monkeypatch.setenv("REBAKE_SOCKET", str(socket_file))
+    cache = TemplateCache(tmp_path / "daemon-cache")
+    started = threading.Event()
+    servers = []
+
+    def on_ready(server):
+        servers.append(server)
+        started.set()
+
+    thread = threading.Thread(target=serve, args=(socket_file, cache), kwargs={"on_ready": on_ready}, daemon=True)
+    thread.start()
+    assert started.wait(5)
+    yield cache
+    servers[0].shutdown()
+    thread.join(5)
+    assert not socket_file.exists()
+
+
+def test_request_returns_none_without_daemon(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("REBAKE_SOCKET", str(tmp_path / "missing.sock"))
+    assert daemon.request("ping") is None
+
+
+def test_request_ignores_socket_other_users_can_reach(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    socket_file = run_dir / "rebake.sock"
+    monkeypatch.setenv("REBAKE_SOCKET", str(socket_file))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(str(socket_file))
+        listener.listen()
+        listener.settimeout(0)
+
+        os.chmod(run_dir, 0o755)
+        os.chmod(socket_file, 0o666)
+        assert daemon.request("ping") is None
+        os.chmod(run_dir, 0o700)
+        assert daemon.request("ping") is None
+
+        # Nothing was sent to the untrusted listener
+        with pytest.raises(BlockingIOError):
+            listener.accept()
+
+
+def test_serve_refuses_shared_directory(tmp_path: Path) -> None:
+    os.chmod(tmp_path, 0o755)
+    with pytest.raises(RuntimeError, match="not accessible to others"):
+        serve(tmp_path / "rebake.sock", TemplateCache(tmp_path / "daemon-cache"))
+    assert not (tmp_path / "rebake.sock").exists()
+
+
+def test_serve_creates_private_socket_directory(template_cache: TemplateCache) -> None:
+    socket_file = socket_path()
+    assert os.stat(socket_file.parent).st_mode & 0o777 == 0o700
+    assert os.stat(socket_file).st_mode & 0o777 == 0o600
+    assert "pid" in daemon.request("ping")
+
+
+@pytest.mark.e2e
+def test_check_uses_daemon(project_dir: Path, template_cache: TemplateCache) -> None:
+    assert "pid" in daemon.request("ping")
+
+    result = runner.invoke(app, ["check", str(project_dir)])
+    assert result.exit_code == 0
+    assert len(template_cache._heads) == 1
+
+
+@pytest.mark.e2e
+def test_update_uses_daemon_mirror_and_renders(
+    project_dir: Path, template_repo: Path, template_cache: TemplateCache
+) -> None:
+    (template_repo / "{{cookiecutter.project_name}}" / "newfile.txt").write_text("hello\n")
+    subprocess.run(["git", "add", "."], cwd=template_repo, check=True)
+    subprocess.run(["git", "commit", "-m", "add newfile.txt"], cwd=template_repo, check=True)
+
+    result = runner.invoke(app, ["update", str(project_dir)])
+    assert result.exit_code == 0, result.output
+    assert (project_dir / "newfile.txt").read_text() == "hello\n"
+    assert list(template_cache.mirrors_dir.iterdir())
+    assert len(template_cache._renders) == 2
+
+
+@pytest.mark.e2e
+def test_update_bypasses_cached_head(project_dir: Path, template_repo: Path, template_cache: TemplateCache) -> None:
+    template_cache.ttl = 3600
+    result = runner.invoke(app, ["check", str(project_dir)])
+    assert result.exit_code == 0
+
+    (template_repo / "{{cookiecutter.project_name}}" / "newfile.txt").write_text("hello\n")
+    subprocess.run(["git", "add", "."], cwd=template_repo, check=True)
+    subprocess.run(["git", "commit", "-m", "add newfile.txt"], cwd=template_repo, check=True)
+
+    # check trusts the cached HEAD within the TTL, update does not
+    assert runner.invoke(app, ["check", str(project_dir)]).exit_code == 0
+    result = runner.invoke(app, ["update", str(project_dir)])
+    assert result.exit_code == 0, result.output
+    assert (project_dir / "newfile.txt").read_text() == "hello\n"
+    assert runner.invoke(app, ["check", str(project_dir)]).exit_code == 0
+
+
+@pytest.mark.e2e
+def test_update_falls_back_when_daemon_fails(
+    project_dir: Path, template_repo: Path, template_cache: TemplateCache
+) -> None:
+    (template_repo / "{{cookiecutter.project_name}}" / "newfile.txt").write_text("hello\n")
+    subprocess.run(["git", "add", "."], cwd=template_repo, check=True)
+    subprocess.run(["git", "commit", "-m", "add newfile.txt"], cwd=template_repo, check=True)
+
+    # The daemon serves the mirror but fails to diff, so the old template must be checked out here
+    with patch.object(TemplateCache, "diff", side_effect=RuntimeError("render failed")):
+        result = runner.invoke(app, ["update", str(project_dir)])
+    assert result.exit_code == 0, result.output
+    assert "continuing without it" in result.output
+    assert (project_dir / "newfile.txt").read_text() == "hello\n"
+
+
+def test_daemon_reports_errors(template_cache: TemplateCache) -> None:
+    with pytest.raises(daemon.DaemonError, match="unknown op"):
+        daemon.request("nope")
+
+
+def test_refresh_survives_failing_templates(tmp_path: Path) -> None:
+    cache = TemplateCache(tmp_path / "daemon-cache")
+    cache._heads = {("broken", None): (0.0, "old"), ("ok", None): (0.0, "old")}
+
+    def head(template: str, checkout: str | None = None) -> str:
+        if template == "broken":
+            raise subprocess.TimeoutExpired(["git", "ls-remote"], 1)
+        return "new"
+
+    with patch("rebake.daemon.get_template_head_commit", side_effect=head):
+        cache.refresh()
+
+    assert cache._heads[("broken", None)][1] == "old"
+    assert cache._heads[("ok", None)][1] == "new"
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import json
 import subprocess
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from typer.testing import CliRunner
@@ -40,3 +42,229 @@ def test_update_removes_deleted_file(project_dir: Path, template_repo: Path) ->
     result = runner.invoke(app, ["update", str(project_dir)])
     assert result.exit_code == 0
     assert not (project_dir / "CONTRIBUTING.md").exists()
+
+
+@pytest.mark.e2e
+def test_update_writes_trace(project_dir: Path, template_repo: Path, tmp_path: Path) -> None:
+    (template_repo / "{{cookiecutter.project_name}}" / "newfile.txt").write_text("hello\n")
+    subprocess.run(["git", "add", "."], cwd=template_repo, check=True)
+    subprocess.run(["git", "commit", "-m", "add newfile.txt"], cwd=template_repo, check=True)
+    trace_file = tmp_path / "trace.json"
+
+    result = runner.invoke(app, ["update", str(project_dir), "--timings", "--trace", str(trace_file)])
+    assert result.exit_code == 0
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    names = {e["name"] for e in events}
+    assert {"update", "resolve", "checkout old", "checkout new", "render old", "render new", "diff", "apply"} <= names
+    assert "git ls-remote" in names
+
+
+@pytest.mark.e2e
+def test_update_links_cached_checkouts_and_renders(project_dir: Path, template_repo: Path, tmp_path: Path) -> None:
+    _commit_template_file(template_repo, "newfile.txt", "hello\n")
+    scratch = tmp_path / "scratch"
+    trace_file = tmp_path / "trace.json"
+
+    result = runner.invoke(app, ["update", str(project_dir), "--scratch-dir", str(scratch)])
+    assert result.exit_code == 0
+    assert scratch.exists()
+    subprocess.run(["git", "reset", "--hard", "HEAD"], cwd=project_dir, check=True)
+    subprocess.run(["git", "clean", "-fd"], cwd=project_dir, check=True)
+
+    with patch("rebake.update.clone_at_commit_async", side_effect=AssertionError("checkouts must be cached")):
+        result = runner.invoke(
+            app, ["update", str(project_dir), "--scratch-dir", str(scratch), "--trace", str(trace_file)]
+        )
+    assert result.exit_code == 0
+    assert (project_dir / "newfile.txt").read_text() == "hello\n"
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    assert all(e["args"].get("cached") for e in events if e["name"].startswith(("checkout", "render")))
+    materialized = [e["args"] for e in events if e["name"] == "materialize"]
+    assert len(materialized) == 4
+    assert sum(a["copied_bytes"] for a in materialized) == 0
+
+
+@pytest.mark.e2e
+def test_update_writes_manifest_for_drift(project_dir: Path, template_repo: Path) -> None:
+    result = runner.invoke(app, ["drift", str(project_dir)])
+    assert result.exit_code == 2
+
+    result = runner.invoke(app, ["update", str(project_dir)])
+    assert result.exit_code == 0
+    assert (project_dir / ".rebake-manifest.json").exists()
+
+    result = runner.invoke(app, ["drift", str(project_dir)])
+    assert result.exit_code == 0
+
+    (project_dir / "README.md").write_text("edited locally\n")
+    result = runner.invoke(app, ["drift", str(project_dir)])
+    assert result.exit_code == 1
+    assert "README.md" in result.output
+
+
+def _commit_template_file(template_repo: Path, name: str, content: str, tag: str | None = None) -> str:
+    (template_repo / "{{cookiecutter.project_name}}" / name).write_text(content)
+    subprocess.run(["git", "add", "."], cwd=template_repo, check=True)
+    subprocess.run(["git", "commit", "-m", f"update {name}"], cwd=template_repo, check=True)
+    if tag:
+        subprocess.run(["git", "tag", tag], cwd=template_repo, check=True)
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=template_repo, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+@pytest.mark.e2e
+def test_update_ndjson_emits_one_record_per_project(project_dir: Path, template_repo: Path, tmp_path: Path) -> None:
+    head = _commit_template_file(template_repo, "newfile.txt", "hello\n")
+    missing = tmp_path / "missing"
+
+    result = runner.invoke(app, ["update", "--format", "ndjson", str(project_dir), str(missing)])
+    assert result.exit_code == 1
+
+    updated, failed = [json.loads(line) for line in result.stdout.splitlines()]
+    assert updated["project"] == str(project_dir)
+    assert updated["status"] == "updated"
+    assert updated["new_commit"] == head
+    assert updated["changed_files"] == ["newfile.txt"]
+    assert updated["rejected_files"] == []
+    assert "render new" in updated["timings"]["phases"]
+    assert failed["project"] == str(missing)
+    assert failed["status"] == "error"
+    assert "not found" in failed["error"]
+    assert "Patch applied" in result.stderr
+
+
+@pytest.mark.e2e
+def test_update_ndjson_reports_rejected_files(project_dir: Path, template_repo: Path) -> None:
+    _commit_template_file(template_repo, "README.md", "# from the template\n")
+    (project_dir / "README.md").write_text("# edited locally\n")
+    subprocess.run(["git", "commit", "-am", "edit README"], cwd=project_dir, check=True)
+
+    result = runner.invoke(app, ["update", "--format", "ndjson", str(project_dir)])
+    assert result.exit_code == 0
+
+    (record,) = [json.loads(line) for line in result.stdout.splitlines()]
+    assert record["status"] == "conflicts"
+    assert record["changed_files"] == ["README.md"]
+    assert record["rejected_files"] == ["README.md"]
+
+
+@pytest.mark.e2e
+def test_update_steps_applies_each_commit(project_dir: Path, template_repo: Path) -> None:
+    _commit_template_file(template_repo, "a.txt", "a\n")
+    head = _commit_template_file(template_repo, "b.txt", "b\n")
+
+    result = runner.invoke(app, ["update", str(project_dir), "--steps", "commits"])
+    assert result.exit_code == 0, result.output
+    assert "Step 2/2" in result.output
+    assert (project_dir / "a.txt").read_text() == "a\n"
+    assert (project_dir / "b.txt").read_text() == "b\n"
+    assert json.loads((project_dir / ".cruft.json").read_text())["commit"] == head
+
+
+@pytest.mark.e2e
+def test_update_steps_only_tagged_releases(project_dir: Path, template_repo: Path) -> None:
+    _commit_template_file(template_repo, "a.txt", "a\n", tag="v1")
+    _commit_template_file(template_repo, "b.txt", "b\n")
+    _commit_template_file(template_repo, "c.txt", "c\n")
+
+    result = runner.invoke(app, ["update", str(project_dir), "--steps", "tags"])
+    assert result.exit_code == 0, result.output
+    assert "Step 2/2" in result.output
+    assert (project_dir / "c.txt").exists()
+
+
+@pytest.mark.e2e
+def test_update_steps_stops_at_conflict_and_resumes(project_dir: Path, template_repo: Path) -> None:
+    (project_dir / "README.md").write_text("# local title\n")
+    subprocess.run(["git", "commit", "-am", "local edit"], cwd=project_dir, check=True)
+    conflicting = _commit_template_file(template_repo, "README.md", "# {{cookiecutter.project_name}} template\n")
+    head = _commit_template_file(template_repo, "newfile.txt", "hello\n")
+
+    result = runner.invoke(app, ["update", str(project_dir), "--steps", "commits"])
+    assert result.exit_code == 0, result.output
+    assert (project_dir / "README.md.rej").exists()
+    assert not (project_dir / "newfile.txt").exists()
+    assert json.loads((project_dir / ".cruft.json").read_text())["commit"] == conflicting
+
+    (project_dir / "README.md.rej").unlink()
+    subprocess.run(["git", "add", "-A"], cwd=project_dir, check=True)
+    subprocess.run(["git", "commit", "-m", "resolve"], cwd=project_dir, check=True)
+
+    result = runner.invoke(app, ["update", str(project_dir), "--steps", "commits"])
+    assert result.exit_code == 0, result.output
+    assert (project_dir / "newfile.txt").read_text() == "hello\n"
+    assert json.loads((project_dir / ".cruft.json").read_text())["commit"] == head
+
+
+def _add_license_variable(template_repo: Path) -> None:
+    (template_repo / "cookiecutter.json").write_text(json.dumps({"project_name": "my-project", "license": "MIT"}))
+    (template_repo / "{{cookiecutter.project_name}}" / "LICENSE").write_text("{{cookiecutter.license}}\n")
+    subprocess.run(["git", "add", "."], cwd=template_repo, check=True)
+    subprocess.run(["git", "commit", "-m", "add license"], cwd=template_repo, check=True)
+
+
+@pytest.mark.e2e
+def test_update_resume_skips_completed_phases(project_dir: Path, template_repo: Path) -> None:
+    _add_license_variable(template_repo)
+
+    with patch("rebake.update.prompt_new_variables", side_effect=RuntimeError("prompt timed out")):
+        result = runner.invoke(app, ["update", str(project_dir)])
+    assert result.exit_code == 1
+    assert "--resume" in result.output
+
+    with (
+        patch("rebake.update.prompt_new_variables", return_value={"license": "Apache-2.0"}),
+        patch("rebake.update.clone_at_commit_async", side_effect=AssertionError("clones must be reused")),
+    ):
+        result = runner.invoke(app, ["update", str(project_dir), "--resume"])
+    assert result.exit_code == 0, result.output
+    assert "Resuming" in result.output
+    assert (project_dir / "LICENSE").read_text() == "Apache-2.0\n"
+
+
+@pytest.mark.e2e
+def test_update_resume_restarts_when_template_moved(project_dir: Path, template_repo: Path) -> None:
+    _add_license_variable(template_repo)
+
+    with patch("rebake.update.prompt_new_variables", side_effect=RuntimeError("prompt timed out")):
+        result = runner.invoke(app, ["update", str(project_dir)])
+    assert result.exit_code == 1
+
+    (template_repo / "{{cookiecutter.project_name}}" / "newfile.txt").write_text("hello\n")
+    subprocess.run(["git", "add", "."], cwd=template_repo, check=True)
+    subprocess.run(["git", "commit", "-m", "add newfile.txt"], cwd=template_repo, check=True)
+
+    with patch("rebake.update.prompt_new_variables", return_value={"license": "Apache-2.0"}):
+        result = runner.invoke(app, ["update", str(project_dir), "--resume"])
+    assert result.exit_code == 0, result.output
+    assert "starting over" in result.output
+    assert (project_dir / "newfile.txt").read_text() == "hello\n"
+
+
+@pytest.mark.e2e
+def test_update_resume_with_steps_restarts_plain_journal(project_dir: Path, template_repo: Path) -> None:
+    _add_license_variable(template_repo)
+
+    with patch("rebake.update.prompt_new_variables", side_effect=RuntimeError("prompt timed out")):
+        result = runner.invoke(app, ["update", str(project_dir)])
+    assert result.exit_code == 1
+
+    # The plain update cached a checkout without history, which a step-wise update cannot walk
+    with patch("rebake.update.prompt_new_variables", return_value={"license": "Apache-2.0"}):
+        result = runner.invoke(app, ["update", str(project_dir), "--resume", "--steps", "commits"])
+    assert result.exit_code == 0, result.output
+    assert "Resuming" not in result.output
+    assert (project_dir / "LICENSE").read_text() == "Apache-2.0\n"
+
+
+@pytest.mark.e2e
+def test_update_steps_failure_does_not_offer_resume(project_dir: Path, template_repo: Path) -> None:
+    _commit_template_file(template_repo, "a.txt", "a\n")
+    _commit_template_file(template_repo, "b.txt", "b\n")
+
+    with patch("rebake.update.render_template", side_effect=RuntimeError("hook failed")):
+        result = runner.invoke(app, ["update", str(project_dir), "--steps", "commits"])
+    assert result.exit_code == 1
+    assert "--resume" not in result.output
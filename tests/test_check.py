@@ -2,7 +2,8 @@ import json
 from pathlib import Path
 from unittest.mock import patch
 
-from rebake.check import CheckResult, is_up_to_date
+from rebake.check import CheckResult, check_projects_async, is_up_to_date
+from rebake.utils.git import run_sync
 
 
 def make_cruft_file(tmp_path, commit: str) -> Path:
@@ -61,3 +62,35 @@ def test_get_template_head_commit_uses_checkout(tmp_path):
         "https://github.com/owner/template",
         checkout="v2",
     )
+
+
+def collect(project_dirs):
+    async def run():
+        return [item async for item in check_projects_async(project_dirs)]
+
+    return {outcome.project_dir: outcome.result or outcome.error for outcome in run_sync(run())}
+
+
+def test_check_projects_resolves_shared_template_once(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first = make_cruft_file(tmp_path / "a", "abc123")
+    second = make_cruft_file(tmp_path / "b", "old000")
+
+    with patch("rebake.check.get_template_head_commit_async", return_value="abc123") as mock_fn:
+        results = collect([first, second])
+
+    assert results == {first: CheckResult.UP_TO_DATE, second: CheckResult.OUTDATED}
+    mock_fn.assert_called_once_with("https://github.com/owner/template", checkout=None)
+
+
+def test_check_projects_yields_errors_per_project(tmp_path):
+    (tmp_path / "ok").mkdir()
+    ok = make_cruft_file(tmp_path / "ok", "abc123")
+    missing = tmp_path / "missing"
+
+    with patch("rebake.check.get_template_head_commit_async", return_value="abc123"):
+        results = collect([ok, missing])
+
+    assert results[ok] == CheckResult.UP_TO_DATE
+    assert isinstance(results[missing], FileNotFoundError)
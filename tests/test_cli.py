@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["cookiecutter", "jinja2", "rich"]
+
+
+def _imported_modules(code: str, modules: list[str] = HEAVY_MODULES) -> list[str]:
+    """Run code in a fresh interpreter and return which of modules ended up in sys.modules."""
+    probe = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {modules!r} if m in sys.modules]))"
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", ["rebake.cli", "rebake.check"])
+def test_import_does_not_load_heavy_modules(module):
+    assert _imported_modules(f"import {module}") == []
+
+
+def test_cli_import_does_not_load_git_layer():
+    # Only commands that talk to git should pay for asyncio and the subprocess layer
+    assert _imported_modules("import rebake.cli", ["asyncio", "rebake.utils.git"]) == []
+
+
+def test_check_command_does_not_load_cookiecutter(project_dir):
+    # A real project, so the ls-remote path and the success output are covered
+    code = f"""
+from rebake.cli import app
+try:
+    app(["check", {str(project_dir)!r}])
+except SystemExit as e:
+    assert e.code == 0, e.code
+"""
+    # rich is allowed here because the command prints its result
+    assert _imported_modules(code) == ["rich"]
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from rebake.utils.git import is_working_tree_clean, run_git_async, run_sync
+
+SLEEP = ["-c", "alias.nap=!sleep 5", "nap"]
+
+
+def test_run_git_async_captures_text_output():
+    result = run_sync(run_git_async(["--version"], text=True, check=True))
+
+    assert result.returncode == 0
+    assert result.stdout.startswith("git version")
+
+
+def test_run_git_async_raises_on_failure_when_check(tmp_path):
+    with pytest.raises(subprocess.CalledProcessError):
+        run_sync(run_git_async(["rev-parse", "HEAD"], cwd=tmp_path, check=True))
+
+
+def test_run_git_async_times_out():
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_sync(run_git_async(SLEEP, timeout=0.2))
+    assert time.monotonic() - start < 4
+
+
+def test_run_git_async_cancellation_kills_process(tmp_path):
+    # A git command that blocks by itself: without a timeout only git is killed, not its children
+    socket_dir = tmp_path / "cache"
+    socket_dir.mkdir(mode=0o700)
+    blocking = ["credential-cache--daemon", str(socket_dir / "socket")]
+
+    async def cancel_after_start():
+        task = asyncio.create_task(run_git_async(blocking))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.monotonic()
+    run_sync(cancel_after_start())
+    assert time.monotonic() - start < 4
+
+
+def test_run_git_async_keeps_session_without_timeout():
+    # Credential and passphrase prompts need the caller's controlling terminal
+    alias = f"alias.sid=!{sys.executable} -c 'import os; print(os.getsid(0))'"
+
+    result = run_sync(run_git_async(["-c", alias, "sid"], text=True, check=True))
+
+    assert int(result.stdout) == os.getsid(0)
+
+
+def test_sync_wrapper(tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    assert is_working_tree_clean(tmp_path)
+
+    (tmp_path / "file.txt").write_text("dirty\n")
+    assert not is_working_tree_clean(tmp_path)
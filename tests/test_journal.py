@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from rebake.journal import CLONED, PROMPTED, Journal
+
+
+def test_for_project_starts_empty(tmp_path):
+    journal = Journal.for_project(tmp_path)
+
+    assert journal.phases == []
+    assert not journal.path.exists()
+
+
+def test_record_persists_and_reloads(tmp_path):
+    journal = Journal.for_project(tmp_path).reset()
+    journal.record(
+        CLONED,
+        template="https://github.com/owner/template",
+        checkout=None,
+        old_commit="abc123",
+        new_commit="def456",
+        project_head="fff000",
+    )
+    journal.record(PROMPTED, context={"project_name": "my-project"})
+
+    loaded = Journal.for_project(tmp_path)
+    assert loaded.phases == [CLONED, PROMPTED]
+    assert loaded.new_commit == "def456"
+    assert loaded.context == {"project_name": "my-project"}
+    assert loaded.matches("https://github.com/owner/template", None, "abc123")
+    assert not loaded.matches("https://github.com/owner/template", "v2", "abc123")
+    assert not loaded.matches("https://github.com/owner/template", None, "abc123", steps="commits")
+
+
+def test_is_current_detects_moved_heads(tmp_path):
+    journal = Journal.for_project(tmp_path).reset()
+    journal.record(CLONED, new_commit="def456", project_head="fff000")
+
+    assert journal.is_current("def456", "fff000")
+    assert not journal.is_current("999999", "fff000")
+    assert not journal.is_current("def456", "eee111")
+
+
+def test_reset_discards_artifacts(tmp_path):
+    journal = Journal.for_project(tmp_path).reset()
+    journal.record(CLONED, new_commit="def456")
+    journal.new_template.mkdir()
+
+    fresh = journal.reset()
+
+    assert fresh.phases == []
+    assert fresh.path.is_dir()
+    assert not fresh.new_template.exists()
+    assert Journal.for_project(Path(tmp_path)).phases == []
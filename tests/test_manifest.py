@@ -0,0 +1,119 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from rebake.manifest import MANIFEST_FILE, FileState, Manifest, _stamps_file
+
+
+def make_tree(tmp_path):
+    root = tmp_path / "rendered"
+    (root / "src").mkdir(parents=True)
+    (root / "README.md").write_text("# my-project\n")
+    (root / "src" / "main.py").write_text("print('hello')\n")
+    (root / "go.sum").write_text("checksum\n")
+    return root
+
+
+def test_from_tree_hashes_files_and_honours_skip(tmp_path):
+    manifest = Manifest.from_tree(make_tree(tmp_path), "abc123", skip=["go.sum"])
+
+    assert manifest.commit == "abc123"
+    assert list(manifest.files) == ["README.md", "src/main.py"]
+    sha256, size = manifest.files["README.md"]
+    assert len(sha256) == 64
+    assert size == len("# my-project\n")
+
+
+def test_save_and_reload(tmp_path):
+    manifest = Manifest.from_tree(make_tree(tmp_path), "abc123")
+    manifest.save(tmp_path)
+
+    raw = json.loads((tmp_path / MANIFEST_FILE).read_text())
+    assert raw["version"] == 1
+    loaded = Manifest.load(tmp_path)
+    assert loaded == manifest
+
+
+def test_load_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Manifest.load(tmp_path)
+
+
+def test_drift_reports_modified_and_deleted_files(tmp_path):
+    project = make_tree(tmp_path)
+    manifest = Manifest.from_tree(project, "abc123")
+    assert manifest.drift(project) == {}
+
+    (project / "README.md").write_text("# changed\n")
+    (project / "src" / "main.py").unlink()
+    (project / "new.txt").write_text("not generated\n")
+
+    assert manifest.drift(project) == {
+        "README.md": FileState.MODIFIED,
+        "src/main.py": FileState.DELETED,
+    }
+
+
+def test_from_tree_skips_directories(tmp_path):
+    root = make_tree(tmp_path)
+    (root / "tests" / "unit").mkdir(parents=True)
+    (root / "tests" / "unit" / "test_main.py").write_text("def test(): pass\n")
+
+    for skip in (["tests"], ["tests/"], ["src", "tests/*"]):
+        assert not any(rel.startswith("tests/") for rel in Manifest.from_tree(root, "abc123", skip=skip).files)
+    assert "src/main.py" not in Manifest.from_tree(root, "abc123", skip=["src"]).files
+
+
+def test_load_drops_stamps_from_version_2(tmp_path):
+    (tmp_path / MANIFEST_FILE).write_text(
+        json.dumps({"version": 2, "commit": "abc123", "files": {"a": ["0" * 64, 3, 123], "b": ["1" * 64, 4, None]}})
+    )
+
+    assert Manifest.load(tmp_path).files == {"a": ("0" * 64, 3), "b": ("1" * 64, 4)}
+
+
+def test_drift_trusts_stamped_mtime(tmp_path):
+    project = make_tree(tmp_path)
+    manifest = Manifest.from_tree(project, "abc123")
+    manifest.save(project)
+    manifest.stamp(project)
+    os.utime(_stamps_file(project), ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+
+    # Stamps stay out of the committed manifest
+    assert all(len(entry) == 2 for entry in json.loads((project / MANIFEST_FILE).read_text())["files"].values())
+
+    with patch("rebake.manifest._sha256", side_effect=AssertionError("unchanged files must not be hashed")):
+        assert Manifest.load(project).drift(project) == {}
+
+    # A same-size edit changes the mtime, so the file is hashed again
+    readme = project / "README.md"
+    st = readme.stat()
+    readme.write_text("# my-projecT\n")
+    os.utime(readme, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert Manifest.load(project).drift(project) == {"README.md": FileState.MODIFIED}
+
+
+def test_drift_detects_same_size_edit(tmp_path):
+    project = make_tree(tmp_path)
+    manifest = Manifest.from_tree(project, "abc123")
+
+    (project / "README.md").write_text("# my-projecT\n")
+
+    assert manifest.drift(project) == {"README.md": FileState.MODIFIED}
+
+
+def test_drift_ignores_stamps_of_other_content(tmp_path):
+    project = make_tree(tmp_path)
+    Manifest.from_tree(project, "abc123").stamp(project)
+    os.utime(_stamps_file(project), ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+
+    # A manifest with other content for an unchanged file (e.g. after switching branches) must hash it
+    (project / "README.md").write_text("# my-projecT\n")
+    changed = Manifest.from_tree(project, "def456")
+    (project / "README.md").write_text("# my-project\n")
+    os.utime(project / "README.md", ns=(0, json.loads(_stamps_file(project).read_text())["README.md"][1]))
+
+    assert changed.drift(project) == {"README.md": FileState.MODIFIED}
@@ -0,0 +1,95 @@
+import os
+from unittest.mock import patch
+
+from rebake.utils.materialize import ENTRY_FILE, load_tree, mark_used, materialize_tree, prune, store_tree
+
+
+def make_tree(tmp_path):
+    root = tmp_path / "src"
+    (root / "pkg").mkdir(parents=True)
+    (root / "README.md").write_text("# my-project\n")
+    (root / "pkg" / "main.py").write_text("print('hello')\n")
+    (root / "link.md").symlink_to("README.md")
+    return root
+
+
+def test_materialize_tree_hardlinks_files(tmp_path):
+    src = make_tree(tmp_path)
+
+    stats = materialize_tree(src, tmp_path / "dest")
+
+    dest = tmp_path / "dest"
+    assert os.path.samefile(src / "pkg" / "main.py", dest / "pkg" / "main.py")
+    assert os.readlink(dest / "link.md") == "README.md"
+    assert stats["files"] == 3
+    assert stats["linked_bytes"] == len("# my-project\n") + len("print('hello')\n")
+    assert stats["copied_bytes"] == 0
+
+
+def test_materialize_tree_falls_back_to_copy(tmp_path):
+    src = make_tree(tmp_path)
+
+    with (
+        patch("rebake.utils.materialize.os.link", side_effect=OSError("cross-device link")),
+        patch("rebake.utils.materialize._reflink", return_value=False),
+    ):
+        stats = materialize_tree(src, tmp_path / "dest")
+
+    dest = tmp_path / "dest"
+    assert (dest / "pkg" / "main.py").read_text() == "print('hello')\n"
+    assert not os.path.samefile(src / "pkg" / "main.py", dest / "pkg" / "main.py")
+    assert stats["linked_bytes"] == 0
+    assert stats["copied_bytes"] == len("# my-project\n") + len("print('hello')\n")
+
+
+def test_store_tree_keeps_the_first_published_copy(tmp_path):
+    entry = tmp_path / "cache" / "entry"
+    store_tree(make_tree(tmp_path), entry)
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "marker").write_text("second\n")
+
+    store_tree(other, entry)
+
+    assert not (entry / "marker").exists()
+    assert [p.name for p in entry.parent.iterdir()] == ["entry"]
+
+
+def test_store_tree_replaces_an_incomplete_entry(tmp_path):
+    entry = tmp_path / "cache" / "entry"
+    entry.mkdir(parents=True)
+    (entry / "leftover").write_text("old\n")
+
+    store_tree(make_tree(tmp_path), entry)
+
+    assert not (entry / "leftover").exists()
+    assert load_tree(entry, tmp_path / "dest")
+    assert not (tmp_path / "dest" / ENTRY_FILE).exists()
+    assert (tmp_path / "dest" / "pkg" / "main.py").read_text() == "print('hello')\n"
+
+
+def test_load_tree_treats_a_partial_entry_as_a_miss(tmp_path):
+    entry = tmp_path / "cache" / "entry"
+    store_tree(make_tree(tmp_path), entry)
+    # What a reader sees when the entry is deleted underneath it
+    (entry / "pkg" / "main.py").unlink()
+
+    assert not load_tree(entry, tmp_path / "dest")
+    assert not (tmp_path / "dest").exists()
+    assert not load_tree(tmp_path / "cache" / "missing", tmp_path / "dest")
+
+
+def test_prune_keeps_most_recently_used_entries(tmp_path):
+    root = tmp_path / "cache"
+    for i, name in enumerate(["a/1", "a/2", "b/3", ".staging", "a/.2.deleted.x"]):
+        (root / name).mkdir(parents=True)
+        os.utime(root / name, ns=(i * 10**9, i * 10**9))
+    mark_used(root / "a" / "1")
+
+    assert prune(root, "*/*", keep=1) == 2
+
+    assert (root / "a" / "1").exists()
+    assert not (root / "a" / "2").exists()
+    assert not (root / "b").exists()
+    assert (root / ".staging").exists()
+    assert not (root / "a" / ".2.deleted.x").exists()
@@ -0,0 +1,41 @@
+from rebake.utils.timing import active_recorder, recording, span, tree_stats
+
+
+def test_span_is_noop_without_recorder():
+    assert active_recorder() is None
+    with span("resolve") as stats:
+        stats["bytes"] = 10
+
+
+def test_recording_collects_nested_spans():
+    with recording() as recorder:
+        with span("update", category="command"):
+            with span("clone new", commit="abc123") as stats:
+                stats["files"] = 3
+
+    assert [(s.name, s.depth) for s in recorder.spans] == [("update", 0), ("clone new", 1)]
+    assert recorder.spans[1].args == {"commit": "abc123", "files": 3}
+    assert recorder.spans[0].duration >= recorder.spans[1].duration
+    assert active_recorder() is None
+
+
+def test_chrome_trace_format():
+    with recording() as recorder:
+        with span("diff") as stats:
+            stats["bytes"] = 42
+
+    trace = recorder.to_chrome_trace({"command": "update"})
+
+    assert trace["otherData"] == {"command": "update"}
+    [event] = trace["traceEvents"]
+    assert event["name"] == "diff"
+    assert event["ph"] == "X"
+    assert event["args"] == {"bytes": 42}
+
+
+def test_tree_stats_skips_git_dir(tmp_path):
+    (tmp_path / "a.txt").write_text("hello")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+
+    assert tree_stats(tmp_path) == {"files": 1, "bytes": 5}
@@ -4,7 +4,8 @@ from unittest.mock import patch
 
 import pytest
 
-from rebake.update import run_update
+from rebake.update import UpdateStatus, _patch_files, run_update
+from rebake.utils.git import generate_diff
 
 
 def make_project(tmp_path: Path, commit: str = "abc123") -> Path:
@@ -24,18 +25,24 @@ def make_project(tmp_path: Path, commit: str = "abc123") -> Path:
 def test_update_aborts_if_working_tree_dirty(tmp_path):
     make_project(tmp_path)
 
-    with patch("rebake.update.is_working_tree_clean", return_value=False):
+    with (
+        patch("rebake.update.is_working_tree_clean_async", return_value=False),
+        patch("rebake.update.get_template_head_commit_async", return_value="def456"),
+        patch("rebake.update.clone_at_commit_async") as mock_clone,
+    ):
         with pytest.raises(RuntimeError, match="uncommitted changes"):
             run_update(tmp_path)
 
+    mock_clone.assert_not_called()
+
 
 def test_update_detects_new_variables_and_prompts(tmp_path):
     project_dir = make_project(tmp_path, commit="abc123")
 
     with (
-        patch("rebake.update.is_working_tree_clean", return_value=True),
-        patch("rebake.update.get_template_head_commit", return_value="def456"),
-        patch("rebake.update.clone_at_commit"),
+        patch("rebake.update.is_working_tree_clean_async", return_value=True),
+        patch("rebake.update.get_template_head_commit_async", return_value="def456"),
+        patch("rebake.update.clone_at_commit_async"),
         patch("rebake.update.render_template", return_value=Path("/tmp/rendered")),
         patch("rebake.update.detect_new_variables", return_value={"license": "MIT"}),
         patch("rebake.update.prompt_new_variables", return_value={"license": "Apache-2.0"}) as mock_prompt,
@@ -51,9 +58,9 @@ def test_update_saves_new_commit_and_context(tmp_path):
     project_dir = make_project(tmp_path, commit="abc123")
 
     with (
-        patch("rebake.update.is_working_tree_clean", return_value=True),
-        patch("rebake.update.get_template_head_commit", return_value="def456"),
-        patch("rebake.update.clone_at_commit"),
+        patch("rebake.update.is_working_tree_clean_async", return_value=True),
+        patch("rebake.update.get_template_head_commit_async", return_value="def456"),
+        patch("rebake.update.clone_at_commit_async"),
         patch("rebake.update.render_template", return_value=Path("/tmp/rendered")),
         patch("rebake.update.detect_new_variables", return_value={"license": "MIT"}),
         patch("rebake.update.prompt_new_variables", return_value={"license": "Apache-2.0"}),
@@ -73,9 +80,9 @@ def test_update_skips_prompt_when_no_new_variables(tmp_path):
     project_dir = make_project(tmp_path, commit="abc123")
 
     with (
-        patch("rebake.update.is_working_tree_clean", return_value=True),
-        patch("rebake.update.get_template_head_commit", return_value="def456"),
-        patch("rebake.update.clone_at_commit"),
+        patch("rebake.update.is_working_tree_clean_async", return_value=True),
+        patch("rebake.update.get_template_head_commit_async", return_value="def456"),
+        patch("rebake.update.clone_at_commit_async"),
         patch("rebake.update.render_template", return_value=Path("/tmp/rendered")),
         patch("rebake.update.detect_new_variables", return_value={}),
         patch("rebake.update.prompt_new_variables") as mock_prompt,
@@ -92,15 +99,53 @@ def test_update_applies_patch(tmp_path):
     patch_content = "some diff content"
 
     with (
-        patch("rebake.update.is_working_tree_clean", return_value=True),
-        patch("rebake.update.get_template_head_commit", return_value="def456"),
-        patch("rebake.update.clone_at_commit"),
+        patch("rebake.update.is_working_tree_clean_async", return_value=True),
+        patch("rebake.update.get_template_head_commit_async", return_value="def456"),
+        patch("rebake.update.clone_at_commit_async"),
         patch("rebake.update.render_template", return_value=Path("/tmp/rendered")),
         patch("rebake.update.detect_new_variables", return_value={}),
         patch("rebake.update.prompt_new_variables"),
         patch("rebake.update.generate_diff", return_value=patch_content),
         patch("rebake.update.apply_patch", return_value=(True, "")) as mock_apply,
     ):
-        run_update(project_dir)
+        result = run_update(project_dir)
 
     mock_apply.assert_called_once_with(patch_content, project_dir.resolve())
+    assert (result.old_commit, result.new_commit) == ("abc123", "def456")
+    assert result.status == UpdateStatus.UPDATED
+
+
+def test_patch_files_lists_each_touched_path():
+    patch_content = (
+        "diff --git a/README.md b/README.md\n"
+        "--- a/README.md\n"
+        "+++ b/README.md\n"
+        "diff --git a/docs/a b/c.md b/docs/a b/c.md\n"
+        "new file mode 100644\n"
+    )
+
+    assert _patch_files(patch_content) == ["README.md", "docs/a b/c.md"]
+
+
+def test_patch_files_lists_both_sides_of_a_rename(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    old.mkdir()
+    new.mkdir()
+    (old / "before.md").write_text("same content\n")
+    (new / "after.md").write_text("same content\n")
+
+    assert sorted(_patch_files(generate_diff(old, new))) == ["after.md", "before.md"]
+
+
+def test_patch_files_decodes_quoted_paths(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    (old / "docs").mkdir(parents=True)
+    (new / "docs").mkdir(parents=True)
+    (old / "docs" / "é.txt").write_text("old\n")
+    (new / "docs" / "é.txt").write_text("new\n")
+    (new / 'say "hi".txt').write_text("hi\n")
+
+    patch_content = generate_diff(old, new)
+
+    assert '"a/docs/\\303\\251.txt"' in patch_content
+    assert sorted(_patch_files(patch_content)) == ["docs/é.txt", 'say "hi".txt']